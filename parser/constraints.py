@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import re
+
+class ConstraintError(Exception):
+	pass
+
+_number = r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eEdD][+-]?[0-9]+)?'
+
+_item = re.compile(r'''
+	\s*(?:
+		(?P<open>[\[(])\s*(?P<low>%(n)s)?\s*[,;]\s*(?P<high>%(n)s)?\s*(?P<close>[\])])   # [a, b), (a, b], ...
+		| (?P<from>%(n)s)\s*(?:\.\.|:)\s*(?P<to>%(n)s)                                   # a..b, a:b
+		| (?P<op><=|>=|<|>)\s*(?P<bound>%(n)s)                                           # >= a
+		| (?P<number>%(n)s)(?![\w.])
+		| '(?P<squote>[^']*)' | "(?P<dquote>[^"]*)"
+	)\s*(?:,|\s|$)
+	''' % {'n': _number}, re.VERBOSE)
+
+def _toNumber(text):
+	text = text.replace('d', 'e').replace('D', 'e')
+	try:
+		return int(text)
+	except ValueError:
+		return float(text)
+
+class AllowedValues:
+	'''A compiled @allowed_values constraint
+	
+	Consists of a set of discrete values and a list of ranges. A value is
+	allowed if it is in the set or in one of the ranges.'''
+	
+	__slots__ = ('__values', '__ranges')
+	
+	def __init__(self, values = (), ranges = ()):
+		self.__values = frozenset(values)
+		# Tuples (low, high, low inclusive, high inclusive), None if unbounded
+		self.__ranges = tuple(ranges)
+		
+	def values(self):
+		return self.__values
+	
+	def ranges(self):
+		return self.__ranges
+	
+	def __inRange(self, value, range):
+		low, high, lowInclusive, highInclusive = range
+		if low is not None and (value < low or (value == low and not lowInclusive)):
+			return False
+		if high is not None and (value > high or (value == high and not highInclusive)):
+			return False
+		return True
+	
+	def __contains__(self, value):
+		if value in self.__values:
+			return True
+		if isinstance(value, (int, float)) and not isinstance(value, bool):
+			return any(self.__inRange(value, range) for range in self.__ranges)
+		return False
+	
+	def invalid(self, values):
+		'''Returns the values that are not allowed
+		
+		Checks the distinct values only. If all remaining values are numbers,
+		a range containing the minimum and the maximum accepts all of them.'''
+		remaining = set(values) - self.__values
+		if not remaining:
+			return []
+		
+		if self.__ranges and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in remaining):
+			low = min(remaining)
+			high = max(remaining)
+			if any(self.__inRange(low, range) and self.__inRange(high, range) for range in self.__ranges):
+				return []
+		
+		return sorted((value for value in remaining if not value in self), key=str)
+	
+	def __str__(self):
+		items = sorted(map(repr, self.__values))
+		for low, high, lowInclusive, highInclusive in self.__ranges:
+			items.append('%s%s, %s%s' % ('[' if lowInclusive else '(',
+				'' if low is None else low, '' if high is None else high,
+				']' if highInclusive else ')'))
+		return ', '.join(items)
+
+def compileAllowedValues(text):
+	'''Compiles the text of an @allowed_values annotation
+	
+	Supported are numbers and quoted strings (enumerations), ranges a..b or
+	a:b, intervals [a, b) and bounds like >= a, separated by commas or
+	spaces. Raises ConstraintError if the text cannot be parsed, e.g. if it
+	is prose.'''
+	values = set()
+	ranges = []
+	
+	pos = 0
+	text = text.strip()
+	while pos < len(text):
+		match = _item.match(text, pos)
+		if not match or match.end() == pos:
+			raise ConstraintError("Could not parse allowed values '%s'" % text)
+		pos = match.end()
+		
+		if match.group('open'):
+			low = match.group('low')
+			high = match.group('high')
+			ranges.append((None if low is None else _toNumber(low), None if high is None else _toNumber(high),
+				match.group('open') == '[', match.group('close') == ']'))
+		elif match.group('from'):
+			ranges.append((_toNumber(match.group('from')), _toNumber(match.group('to')), True, True))
+		elif match.group('op'):
+			bound = _toNumber(match.group('bound'))
+			op = match.group('op')
+			if op[0] == '>':
+				ranges.append((bound, None, op == '>=', False))
+			else:
+				ranges.append((None, bound, False, op == '<='))
+		elif match.group('number'):
+			values.add(_toNumber(match.group('number')))
+		elif match.group('squote') is not None:
+			values.add(match.group('squote'))
+		else:
+			values.add(match.group('dquote'))
+	
+	if not values and not ranges:
+		raise ConstraintError('No allowed values found')
+	return AllowedValues(values, ranges)
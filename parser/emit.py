@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import json
+import os
+import sys
+import tempfile
+
+import schema
+
+class Emitter:
+	'''Base class for output formats
+	
+	emit() calls the methods of all emitters during one traversal of the
+	namelists. Subclasses collect their output with write(), the output is
+	written to the file at once by close(). The file is replaced atomically
+	and only if the content changed, so its modification time is kept
+	otherwise.'''
+	
+	def __init__(self, filename):
+		self.__filename = filename
+		self.__chunks = []
+		self.__changed = False
+		
+	def filename(self):
+		return self.__filename
+		
+	def write(self, text):
+		self.__chunks.append(text)
+		
+	def begin(self):
+		pass
+	
+	def beginNamelist(self, namelist):
+		pass
+	
+	def parameter(self, namelist, parameter):
+		pass
+	
+	def endNamelist(self, namelist):
+		pass
+	
+	def end(self):
+		pass
+	
+	def changed(self):
+		'''True if the last close() modified the file'''
+		return self.__changed
+	
+	def content(self):
+		'''Returns the bytes for the file, binary formats override it'''
+		return ''.join(self.__chunks).encode()
+	
+	def close(self):
+		self.__changed = _replaceFile(self.__filename, self.content())
+		self.__chunks = []
+
+def _replaceFile(filename, data):
+	'''Writes the bytes atomically if the file has a different content
+	
+	A new file gets the default permissions, an existing one keeps them.
+	Returns True if the file was written.'''
+	try:
+		if os.path.getsize(filename) == len(data):
+			with open(filename, 'rb') as f:
+				if f.read() == data:
+					return False
+		mode = os.stat(filename).st_mode & 0o777
+	except FileNotFoundError:
+		umask = os.umask(0)
+		os.umask(umask)
+		mode = 0o666 & ~umask
+	
+	fd, tmpFile = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)))
+	try:
+		with os.fdopen(fd, 'wb') as f:
+			f.write(data)
+		os.chmod(tmpFile, mode)
+		os.replace(tmpFile, filename)
+	except:
+		os.unlink(tmpFile)
+		raise
+	return True
+
+def _description(annotation):
+	'''Returns the annotation text without the indentation'''
+	return '\n'.join(line.strip() for line in annotation.text().strip().splitlines())
+
+def _defaults(parameter):
+	'''Returns the default values without the quotes of strings'''
+	values = list(parameter.values())
+	if parameter.define().type().type() == 'character':
+		values = [value[1:-1] for value in values]
+	return values
+
+class ParameterFileEmitter(Emitter):
+	'''Writes the default parameter file
+	
+	With repeat, runs of equal array elements are written with the repeat
+	syntax of Fortran namelists (n*value).'''
+	
+	def __init__(self, filename, repeat = False):
+		super().__init__(filename)
+		self.__noDefault = 0
+		self.__repeat = repeat
+		
+	def noDefault(self):
+		'''Number of parameters without a default value'''
+		return self.__noDefault
+	
+	def beginNamelist(self, namelist):
+		self.write('!-----------------------------\n&%s\n!-----------------------------\n' % namelist.name())
+		
+	def parameter(self, namelist, parameter):
+		define = parameter.define()
+		type = define.type()
+		
+		lines = ['']
+		if define.annotation():
+			lines.append(define.annotation().format())
+			
+		if type.type() == 'character' and type.hasLength():
+			lines.append('! Max length: %d' % type.length)
+		
+		if type.hasDimension():
+			if type.dimension == 'inf':
+				lines.append('! WARNING: Dimension set at runtime')
+			else:
+				lines.append('! Dimension size: %d' % type.dimension)
+		
+		diagnostics = parameter.diagnostics()
+		if not diagnostics.hasValues():
+			lines.append('! WARNING: Default value not found')
+			self.__noDefault += 1
+		else:
+			if not diagnostics.hasAllValues():
+				lines.append('! WARNING: Not all default values set in array')
+			if not diagnostics.hasCorrectValueType():
+				lines.append('! ERROR: Invalid convertion for default value to %s' % type.type())
+			for warning in diagnostics.warnings():
+				print(warning, file=sys.stderr)
+		
+		# Values that could not be converted are not valid in a parameter
+		# file, the assignment is commented out to keep the file readable
+		assignment = '%s ='
+		if type.type() in ('integer', 'real') and any(isinstance(value, str) for _, value in diagnostics.runs()):
+			assignment = '! ' + assignment
+		
+		if self.__repeat:
+			lines.append(assignment % parameter.name())
+			self.write('\n'.join(lines))
+			for count, value in diagnostics.runs():
+				value = str(value)
+				if count > 1 and value:
+					self.write(' %d*%s' % (count, value))
+				else:
+					self.write((' ' + value) * count)
+			self.write('\n')
+		else:
+			lines.append((assignment + ' %s\n') % (parameter.name(), ' '.join(map(str, diagnostics.values()))))
+			self.write('\n'.join(lines))
+		
+	def endNamelist(self, namelist):
+		self.write('/\n\n')
+
+class JsonEmitter(Emitter):
+	'''Writes the namelists, types and defaults as JSON'''
+	
+	def begin(self):
+		self.__namelists = []
+		
+	def beginNamelist(self, namelist):
+		self.__parameters = []
+		self.__namelists.append({'name': namelist.name(), 'parameters': self.__parameters})
+		
+	def parameter(self, namelist, parameter):
+		define = parameter.define()
+		type = define.type()
+		annotation = define.annotation()
+		diagnostics = parameter.diagnostics()
+		self.__parameters.append({
+			'name': parameter.name(),
+			'type': type.type(),
+			'length': type.length if type.hasLength() else None,
+			'dimension': type.dimension if type.hasDimension() else None,
+			'size': define.size(),
+			'default': _defaults(parameter) if diagnostics.hasValues() else None,
+			'description': _description(annotation) if annotation else None,
+			'allowedValues': annotation.allowedValues() if annotation else None
+		})
+		
+	def end(self):
+		self.write(json.dumps({'namelists': self.__namelists}, indent='\t'))
+		self.write('\n')
+
+def _markdownCell(text):
+	return text.replace('|', '\\|').replace('\n', '<br>')
+
+class MarkdownEmitter(Emitter):
+	'''Writes a documentation page with one table per namelist'''
+	
+	def begin(self):
+		self.write('# Parameters\n')
+		
+	def beginNamelist(self, namelist):
+		self.write('\n## %s\n\n| Parameter | Type | Default | Description |\n| --- | --- | --- | --- |\n' % namelist.name())
+		
+	def parameter(self, namelist, parameter):
+		define = parameter.define()
+		annotation = define.annotation()
+		
+		default = ''
+		if parameter.diagnostics().hasValues():
+			default = '`%s`' % ' '.join(map(str, parameter.values()))
+		
+		self.write('| %s | %s | %s | %s |\n' % (parameter.name(), define.type(), default,
+			_markdownCell(_description(annotation)) if annotation else ''))
+
+class CppHeaderEmitter(Emitter):
+	'''Writes the default values as C++ constants
+	
+	Every namelist becomes a namespace. Parameters with a dimension set at
+	runtime or without a valid default value are only listed in a comment.'''
+	
+	__types = {'integer': 'int', 'real': 'double', 'character': 'const char*'}
+	
+	def __init__(self, filename, namespace = 'seissol::parameters'):
+		super().__init__(filename)
+		self.__namespace = namespace
+		
+	def begin(self):
+		self.write('// Generated by parameter-parser.py, do not edit\n\n#pragma once\n\nnamespace %s {\n' % self.__namespace)
+		
+	def beginNamelist(self, namelist):
+		self.write('\nnamespace %s {\n' % namelist.name())
+		
+	def parameter(self, namelist, parameter):
+		define = parameter.define()
+		type = define.type()
+		diagnostics = parameter.diagnostics()
+		
+		if not type.type() in self.__types:
+			self.write('// %s: type %s not supported\n' % (parameter.name(), type.type()))
+			return
+		if type.hasDimension():
+			self.write('// %s: dimension set at runtime\n' % parameter.name())
+			return
+		if not diagnostics.hasValues() or not diagnostics.hasCorrectValueType():
+			self.write('// %s: no valid default value\n' % parameter.name())
+			return
+		
+		if type.type() == 'character':
+			values = [json.dumps(value) for value in _defaults(parameter)]
+		else:
+			values = list(map(repr, parameter.values()))
+		
+		if define.size() == 1:
+			self.write('constexpr %s %s = %s;\n' % (self.__types[type.type()], parameter.name(), values[0]))
+		else:
+			self.write('constexpr %s %s[%d] = {%s};\n' % (self.__types[type.type()], parameter.name(),
+				define.size(), ', '.join(values)))
+		
+	def endNamelist(self, namelist):
+		self.write('}\n')
+		
+	def end(self):
+		self.write('\n}\n')
+
+class SchemaEmitter(Emitter):
+	'''Writes the schema file read by schema.SchemaFile'''
+	
+	def begin(self):
+		self.__index = []
+		self.__records = []
+		self.__offset = 0
+		
+	def beginNamelist(self, namelist):
+		self.__parameters = []
+		self.__index.append((namelist.name(), self.__parameters))
+		
+	def parameter(self, namelist, parameter):
+		record = json.dumps(schema.parameterRecord(parameter), separators=(',', ':')).encode()
+		self.__parameters.append((parameter.name(), self.__offset, len(record)))
+		self.__records.append(record)
+		self.__offset += len(record)
+		
+	def content(self):
+		# Tools might read the old schema at the same time, close() replaces it atomically
+		return schema.packSchema(self.__index, self.__records)
+
+# Emitters by format name
+EMITTERS = {
+	'par': ParameterFileEmitter,
+	'json': JsonEmitter,
+	'markdown': MarkdownEmitter,
+	'cpp': CppHeaderEmitter,
+	'schema': SchemaEmitter
+}
+
+def emit(namelists, emitters):
+	'''Passes all namelists and parameters once to all emitters'''
+	for emitter in emitters:
+		emitter.begin()
+	
+	for namelist in namelists:
+		for emitter in emitters:
+			emitter.beginNamelist(namelist)
+		for parameter in namelist.parameters():
+			for emitter in emitters:
+				emitter.parameter(namelist, parameter)
+		for emitter in emitters:
+			emitter.endNamelist(namelist)
+	
+	for emitter in emitters:
+		emitter.end()
+		emitter.close()
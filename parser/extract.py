@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import contextlib
+import glob
+import multiprocessing
+import os
+import sys
+import tracemalloc
+
+import preprocessor
+from incremental import IncrementalParser
+from lexer import FortranLexer
+from pool import ParserPool
+from prefilter import filterSource
+from stats import Stats
+from tokencache import TokenCache
+from yacc import FortranYacc, ParseError
+
+class Result:
+	'''The namelists extracted from one source file'''
+	
+	def __init__(self, filename, namelists, lexError, parseError, stats = None):
+		self.__filename = filename
+		self.__namelists = namelists
+		self.__lexError = lexError
+		self.__parseError = parseError
+		self.__stats = stats
+		
+	def filename(self):
+		return self.__filename
+	
+	def namelists(self):
+		return self.__namelists
+	
+	def hasLexError(self):
+		return self.__lexError
+	
+	def hasParseError(self):
+		return self.__parseError
+	
+	def stats(self):
+		'''The stats.Stats of this file or None'''
+		return self.__stats
+
+def expandInputs(patterns):
+	'''Expands glob patterns into a list of files
+	
+	The order of the patterns is kept, matches of one pattern are sorted.
+	Patterns without a match are kept as they are (opening them will fail
+	later with a useful error message).'''
+	filenames = []
+	for pattern in patterns:
+		matches = sorted(glob.glob(pattern, recursive=True))
+		if not matches:
+			matches = [pattern]
+		for filename in matches:
+			if not filename in filenames:
+				filenames.append(filename)
+	return filenames
+
+def parseFile(filename, lexer, yacc, prefilter = False, batch = False):
+	'''Parses a single file with the given lexer and parser
+	
+	With prefilter, statements that are not relevant for the namelists are
+	removed before parsing (see prefilter.filterSource). With batch, the
+	file is tokenized at once with a lexer.BatchLexer.
+	
+	The lexer and the parser are reset first, the error flags of the
+	result only belong to this file.'''
+	lexer.reset()
+	yacc.reset()
+	stats = yacc.stats()
+	if stats:
+		stats.setFile(filename)
+	
+	with open(filename) as f:
+		if prefilter or batch:
+			text = f.read()
+			if prefilter:
+				with stats.phase('prefilter') if stats else contextlib.nullcontext():
+					text = filterSource(text)
+			yacc.parse(text, lexer, batch=batch)
+		else:
+			yacc.parseStream(f, lexer)
+	return Result(filename, yacc.namelists(), lexer.hasError(), yacc.hasError(), stats)
+
+def parseFileVariants(filename, lexer, yacc, variants):
+	'''Parses a single file for several configurations of preprocessor macros
+	
+	variants maps names to dictionaries of macros (name -> value). The file
+	is tokenized once with a lexer.BatchLexer, each variant parses the tokens
+	of the active #if branches (see preprocessor.activeRanges). Returns a
+	dictionary name -> Result.'''
+	stats = yacc.stats()
+	if stats:
+		stats.setFile(filename)
+	
+	with open(filename) as f:
+		text = f.read()
+	lexer.reset()
+	with stats.phase('lex') if stats else contextlib.nullcontext():
+		tokens = lexer.batchLexer(text)
+	
+	results = dict()
+	for name, macros in variants.items():
+		ranges = preprocessor.activeRanges(tokens.directives(), len(tokens), macros)
+		try:
+			yacc.parseTokens(tokens.view(ranges))
+		except ParseError as e:
+			# Usually a declaration that only exists in other variants
+			print("ERROR: %s in '%s' (variant '%s')" % (e, filename, name), file=sys.stderr)
+			results[name] = Result(filename, [], lexer.hasError(), True, stats)
+			continue
+		results[name] = Result(filename, yacc.namelists(), lexer.hasError(), yacc.hasError(), stats)
+	return results
+
+def createVariantParser(cacheDir, variants, tokenCache = False):
+	'''Returns a function that parses one file for all variants (see parseFileVariants)'''
+	pool = ParserPool(cacheDir, 1)
+	cache = TokenCache(cacheDir) if tokenCache else None
+	def parse(filename):
+		with pool.parser() as (lexer, yacc):
+			lexer.setTokenCache(cache)
+			return parseFileVariants(filename, lexer, yacc, variants)
+	return parse
+
+def parseVariants(filenames, variants, jobs = None, cacheDir = None, tokenCache = False):
+	'''Parses all files for several configurations of preprocessor macros
+	
+	Returns a dictionary variant name -> list of Result objects in the same
+	order as filenames (see parseFileVariants). The files are distributed
+	to jobs worker processes like in parseFiles. tokenCache stores the
+	tokens in cacheDir (see tokencache.TokenCache).'''
+	if tokenCache and not cacheDir:
+		raise ValueError('The token cache requires a cache directory')
+	
+	fileResults = _mapFiles(filenames, jobs, cacheDir, False, createVariantParser, (cacheDir, variants, tokenCache))
+	return {name: [results[name] for results in fileResults] for name in variants}
+
+def parseFileIncremental(filename, parser):
+	'''Parses a single file with an IncrementalParser'''
+	if parser.stats():
+		parser.stats().setFile(filename)
+	with open(filename) as f:
+		return Result(filename, *parser.parse(f.read()), parser.stats())
+
+def createParser(cacheDir, incremental, prefilter, collectStats = False, batch = False, tokenCache = False):
+	'''Returns a function that parses one file
+	
+	The lexer and the parser tables are kept for all calls. With
+	collectStats, every result gets a new stats.Stats object. tokenCache
+	reads the tokens from a tokencache.TokenCache in cacheDir (implies batch,
+	not used by the incremental mode).'''
+	if incremental:
+		parser = IncrementalParser(cacheDir, prefilter, batch)
+		def parse(filename):
+			if collectStats:
+				parser.setStats(Stats())
+			return parseFileIncremental(filename, parser)
+		return parse
+	
+	pool = ParserPool(cacheDir, 1)
+	cache = TokenCache(cacheDir) if tokenCache else None
+	def parse(filename):
+		with pool.parser() as (lexer, yacc):
+			lexer.setTokenCache(cache)
+			if collectStats:
+				yacc.setStats(Stats())
+			return parseFile(filename, lexer, yacc, prefilter, batch or tokenCache)
+	return parse
+
+# Parse function of a worker process
+_worker = None
+
+def _initWorker(traceMemory, create, args):
+	global _worker
+	if traceMemory:
+		tracemalloc.start()
+	_worker = create(*args)
+	
+def _parseWorker(filename):
+	return _worker(filename)
+
+def _mapFiles(filenames, jobs, cacheDir, traceMemory, create, args):
+	'''Parses the files with the function returned by create(*args)
+	
+	Uses a pool of jobs worker processes, each creates its own function.'''
+	if jobs is None:
+		jobs = os.cpu_count() or 1
+	jobs = max(1, min(jobs, len(filenames)))
+	
+	if jobs == 1:
+		return list(map(create(*args), filenames))
+	
+	if cacheDir:
+		# Build the tables once before the workers start reading them
+		FortranYacc(FortranLexer(cacheDir).tokens(), cacheDir)
+	
+	with multiprocessing.Pool(jobs, _initWorker, (traceMemory, create, args)) as pool:
+		return pool.map(_parseWorker, filenames, chunksize=1)
+
+def parseFiles(filenames, jobs = None, cacheDir = None, incremental = False, prefilter = False,
+		collectStats = False, traceMemory = False, batch = False, tokenCache = False):
+	'''Parses all files in a pool of worker processes
+	
+	Returns a list of Result objects in the same order as filenames.
+	jobs defaults to the number of cores. The incremental mode requires a
+	cacheDir. prefilter enables the fast path that removes irrelevant
+	statements before parsing. collectStats attaches a stats.Stats object
+	to every result, traceMemory starts tracemalloc in the worker processes.
+	batch tokenizes every file at once with a lexer.BatchLexer, tokenCache
+	also stores the tokens in cacheDir.'''
+	if incremental and not cacheDir:
+		raise ValueError('The incremental mode requires a cache directory')
+	if tokenCache and not cacheDir:
+		raise ValueError('The token cache requires a cache directory')
+	
+	return _mapFiles(filenames, jobs, cacheDir, traceMemory, createParser,
+		(cacheDir, incremental, prefilter, collectStats, batch, tokenCache))
+
+def mergeNamelists(results):
+	'''Merges the namelists of all results in a deterministic order
+	
+	Namelists are ordered by file and by their position in the file.
+	Namelist names are compared case insensitive. For duplicates, only the
+	first namelist is kept.
+	
+	Returns the merged namelists and the list of duplicates as tuples
+	(name, first filename, duplicate filename).'''
+	namelists = []
+	duplicates = []
+	origin = dict()
+	for result in results:
+		for namelist in result.namelists():
+			lname = namelist.name().lower()
+			if lname in origin:
+				print("ERROR: Namelist '%s' in '%s' already defined in '%s'"
+					% (namelist.name(), result.filename(), origin[lname]), file=sys.stderr)
+				duplicates.append((namelist.name(), origin[lname], result.filename()))
+			else:
+				origin[lname] = result.filename()
+				namelists.append(namelist)
+	return namelists, duplicates
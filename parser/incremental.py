@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+
+import constraints
+import lexer
+import namelist
+import prefilter
+import tables
+import yacc
+from lexer import FortranLexer
+from prefilter import filterSource
+from yacc import FortranYacc
+
+# Keywords are only tokens if they are not part of a longer identifier
+# (e.g. ENDSUBROUTINE is an identifier for the lexer)
+_moduleStart = re.compile(r'[ \t]*module[ \t]+(?!procedure(?![a-z0-9_]))[a-z]', re.IGNORECASE)
+_moduleEnd = re.compile(r'[ \t]*end[ \t]+module(?![a-z0-9_])', re.IGNORECASE)
+_subroutineStart = re.compile(r'[ \t]*subroutine[ \t]+[a-z]', re.IGNORECASE)
+_subroutineEnd = re.compile(r'[ \t]*end[ \t]+subroutine(?![a-z0-9_])', re.IGNORECASE)
+
+def splitSubroutines(text):
+	'''Splits a Fortran source into the module skeleton and its subroutines
+	
+	Only subroutines inside a module are split off, since the grammar
+	ignores all others. In the skeleton, every subroutine is replaced by
+	empty lines to keep the line numbers.
+	
+	Returns the skeleton and a list of tuples (first line, subroutine text).
+	If the subroutines are not properly terminated, the whole text is
+	returned as skeleton.'''
+	lines = [line + '\n' for line in text.split('\n')]
+	lines[-1] = lines[-1][:-1]
+	
+	skeleton = []
+	subroutines = []
+	inModule = False
+	depth = 0
+	for i, line in enumerate(lines):
+		if depth:
+			# Nested subroutines stay part of the outer one
+			if _subroutineStart.match(line):
+				depth += 1
+			elif _subroutineEnd.match(line):
+				depth -= 1
+				if not depth:
+					subroutines.append((start+1, ''.join(lines[start:i+1])))
+			skeleton.append('\n')
+		elif inModule and _subroutineStart.match(line):
+			depth = 1
+			start = i
+			skeleton.append('\n')
+		else:
+			if _moduleStart.match(line):
+				inModule = True
+			elif _moduleEnd.match(line):
+				inModule = False
+			skeleton.append(line)
+			
+	if depth:
+		return text, []
+	return ''.join(skeleton), subroutines
+
+# Maximum number of cached subroutines, see pruneCache
+MAX_ENTRIES = 20000
+
+def _codeVersion():
+	'''Hash of the lexer, grammar, model and prefilter, cached results depend on all of them'''
+	h = hashlib.sha1()
+	for module in (constraints, lexer, yacc, namelist, prefilter):
+		with open(module.__file__, 'rb') as f:
+			h.update(f.read())
+	return h.hexdigest()
+
+def pruneCache(cacheDir, maxEntries = MAX_ENTRIES):
+	'''Removes the least recently used subroutines from the cache in cacheDir'''
+	tables.pruneDirectory(os.path.join(cacheDir, 'incremental'), maxEntries)
+
+class IncrementalParser:
+	'''Parses Fortran sources subroutine by subroutine
+	
+	The results (namelists and error flags) of each subroutine are stored
+	in cacheDir, keyed by a hash of the subroutine text. Only subroutines
+	that changed since the last run are parsed again. The cache grows with
+	every edit, pruneCache removes old entries.
+	
+	With prefilter, changed subroutines are passed through
+	prefilter.filterSource before parsing. With batch, they are tokenized
+	with a lexer.BatchLexer.'''
+	
+	def __init__(self, cacheDir, prefilter = False, batch = False):
+		self.__cacheDir = os.path.join(cacheDir, 'incremental')
+		os.makedirs(self.__cacheDir, exist_ok=True)
+		self.__tableDir = cacheDir
+		self.__version = _codeVersion()
+		self.__prefilter = prefilter
+		self.__batch = batch
+		# Created on the first cache miss
+		self.__lexer = None
+		self.__yacc = None
+		self.__stats = None
+		
+	def setStats(self, stats):
+		'''Enables the instrumentation (see FortranYacc.setStats)'''
+		self.__stats = stats
+		if self.__yacc:
+			self.__yacc.setStats(stats)
+			
+	def stats(self):
+		return self.__stats
+		
+	def parse(self, text):
+		'''Returns the namelists, the lexer error flag and the parser error flag'''
+		skeleton, subroutines = splitSubroutines(text)
+		
+		namelists = []
+		lexError = False
+		parseError = False
+		
+		units = [('skeleton', skeleton, 1)] + [('subroutine', text, line) for line, text in subroutines]
+		for kind, text, line in units:
+			result = self.__parseUnit(kind, text, line)
+			namelists.extend(result[0])
+			lexError = lexError or result[1]
+			parseError = parseError or result[2]
+			
+		return namelists, lexError, parseError
+	
+	def __parseUnit(self, kind, text, line):
+		key = hashlib.sha1((self.__version + kind + str(self.__prefilter) + text).encode()).hexdigest()
+		cacheFile = os.path.join(self.__cacheDir, key + '.pickle')
+		try:
+			with open(cacheFile, 'rb') as f:
+				result = pickle.load(f)
+			tables.touch(cacheFile)
+			if self.__stats:
+				self.__stats.count('incremental cache hit')
+			return result
+		except (OSError, pickle.UnpicklingError, EOFError):
+			pass
+		if self.__stats:
+			self.__stats.count('incremental cache miss')
+		
+		if kind == 'subroutine':
+			# Parse the subroutine as the only statement of a module
+			text = 'MODULE incremental\n' + text
+			if not text.endswith('\n'):
+				text += '\n'
+			text += 'END MODULE incremental\n'
+			line -= 1
+		if self.__prefilter:
+			text = filterSource(text)
+			
+		if not self.__lexer:
+			self.__lexer = FortranLexer(self.__tableDir)
+			self.__yacc = FortranYacc(self.__lexer.tokens(), self.__tableDir)
+			self.__yacc.setStats(self.__stats)
+		
+		self.__yacc.parse(text, self.__lexer, line, self.__batch)
+		result = (self.__yacc.namelists(), self.__lexer.hasError(), self.__yacc.hasError())
+		
+		# Write atomically, other processes might read the same entry
+		fd, tmpFile = tempfile.mkstemp(dir=self.__cacheDir)
+		with os.fdopen(fd, 'wb') as f:
+			pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+		os.replace(tmpFile, cacheFile)
+		
+		return result
@@ -38,14 +38,25 @@
 # @section DESCRIPTION
 #
 
+import array
 import collections
+import io
+import locale
+import mmap
+import re
 import sys
 
 import ply.lex as lex
 
+import tables
+
 class LexError(Exception):
 	pass
 
+class IncompleteInput(Exception):
+	'''Raised if a token might continue in the next block of a StreamLexer'''
+	pass
+
 def MergeLexer(lexer, mergeTokens = {}, mergeValue = ' '):
 	'''Overrides to token function in the Lexer to merge tokens'''
 	def token():
@@ -81,6 +92,403 @@ def MergeLexer(lexer, mergeTokens = {}, mergeValue = ' '):
 	lexer.virtualTokens = virtualTokens
 	return lexer
 
+# Default block size of the StreamLexer
+BLOCK_SIZE = 1 << 20
+
+def _blockEnd(data, start):
+	'''Returns the first block end after start or -1
+	
+	Blocks end after a line break that is not followed by another line
+	break. Otherwise the END_LINE token could be split between two blocks.'''
+	while True:
+		end = data.find(b'\n', start)
+		if end < 0 or end + 1 >= len(data):
+			return -1
+		end += 1
+		if data[end:end+1] not in (b'\n', b'\r'):
+			return end
+		start = end
+
+def _mmapBlocks(data, blockSize):
+	pos = 0
+	while pos < len(data):
+		end = _blockEnd(data, pos + blockSize)
+		if end < 0:
+			end = len(data)
+		yield data[pos:end]
+		pos = end
+		
+def _readBlocks(f, blockSize):
+	buf = b''
+	while True:
+		chunk = f.read(blockSize)
+		if not chunk:
+			if buf:
+				yield buf
+			return
+		buf += chunk
+		end = _blockEnd(buf, blockSize)
+		while end > 0:
+			yield buf[:end]
+			buf = buf[end:]
+			end = _blockEnd(buf, blockSize)
+
+class StreamLexer:
+	'''Feeds a PLY lexer block by block from a file
+	
+	The file is memory-mapped if possible and read in chunks otherwise.
+	Only the current block is decoded and passed to the lexer, so the memory
+	usage does not depend on the file size. Blocks end at line breaks. If a
+	token does not fit into the block (i.e. a string literal over several
+	lines), the lexer raises IncompleteInput and the block is extended.
+	
+	The lexer has to be wrapped by MergeLexer, since StreamLexer uses the
+	original token function.'''
+	
+	def __init__(self, lexer, f, blockSize = BLOCK_SIZE):
+		self.__lexer = lexer
+		self.__token = lexer._token
+		
+		self.__encoding = getattr(f, 'encoding', None) or locale.getpreferredencoding(False)
+		f = getattr(f, 'buffer', f)
+		try:
+			self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			self.__blocks = _mmapBlocks(self.__mmap, blockSize)
+		except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+			# No regular file or empty file
+			self.__mmap = None
+			self.__blocks = _readBlocks(f, blockSize)
+			
+		# Position of the current block in the input
+		self.__offset = 0
+		self.__nextBlock = next(self.__blocks, None)
+		self.__lexer.input('')
+		
+	@property
+	def lineno(self):
+		return self.__lexer.lineno
+	
+	@lineno.setter
+	def lineno(self, lineno):
+		self.__lexer.lineno = lineno
+		
+	def token(self):
+		while True:
+			try:
+				token = self.__token()
+			except IncompleteInput:
+				# Continue with the rest of this block and the next block
+				self.__offset += self.__lexer.lexpos
+				self.__input(self.__lexer.lexdata[self.__lexer.lexpos:] + self.__decode(self.__nextBlock))
+				continue
+				
+			if token:
+				token.lexpos += self.__offset
+				return token
+			if self.__nextBlock is None:
+				return None
+			
+			self.__offset += self.__lexer.lexlen
+			self.__input(self.__decode(self.__nextBlock))
+			
+	def close(self):
+		self.__lexer.incomplete = False
+		if self.__mmap:
+			self.__mmap.close()
+			self.__mmap = None
+			
+	def __decode(self, block):
+		# Same newline translation as files opened in text mode
+		return block.decode(self.__encoding).replace('\r\n', '\n').replace('\r', '\n')
+	
+	def __input(self, text):
+		self.__nextBlock = next(self.__blocks, None)
+		self.__lexer.incomplete = self.__nextBlock is not None
+		self.__lexer.input(text)
+
+# Actions of the BatchLexer for the rules of the FortranLexer
+_BATCH_TOKEN, _BATCH_ID, _BATCH_IGNORE, _BATCH_NEW_LINE, _BATCH_COMMENT, \
+	_BATCH_END_LINE, _BATCH_INT, _BATCH_KEYWORD, _BATCH_ANNOTATION, _BATCH_DIRECTIVE = range(10)
+_BATCH_ACTIONS = {
+	'ID': _BATCH_ID,
+	'FLOAT': _BATCH_IGNORE,
+	'PREPROCESSOR': _BATCH_DIRECTIVE,
+	'ignore_LINE_BREAK': _BATCH_NEW_LINE,
+	'COMMENT': _BATCH_COMMENT,
+	'END_LINE': _BATCH_END_LINE,
+	'INT': _BATCH_INT,
+	'ANNO_KEYWORD': _BATCH_KEYWORD,
+	'ANNO_START': _BATCH_ANNOTATION,
+	'ANNO_CONTINUE': _BATCH_ANNOTATION
+}
+# Token types that differ from the rule names
+_BATCH_TYPES = {
+	'COMMENT': 'END_LINE'
+}
+
+class BatchLexer:
+	'''Tokenizes a whole text at once
+	
+	Uses the master regular expressions of the PLY lexer, but stores the
+	tokens in parallel arrays (type, start, end, line) instead of creating a
+	LexToken for every match. The END tokens are merged with the following
+	MODULE/SUBROUTINE tokens while sweeping. token() creates the LexToken
+	objects for the parser. The token stream is the same as the one of the
+	FortranLexer.
+	
+	Preprocessor directives are dropped from the token stream like in the
+	FortranLexer, but they are kept with their position (see directives()),
+	so view() can select the tokens of one configuration of macros.
+	
+	state() returns everything except the text, a BatchLexer created with
+	this state and the same text replays the tokens and the messages
+	without tokenizing the text again.'''
+	
+	def __init__(self, lexer, text, lineno, reserved, reservedAnnotation, mergeTokens, error, state = None):
+		self.__text = text
+		self.__error = error
+		self.__hasError = False
+		# Printed messages as tuples (printed to stdout, message)
+		self.__messages = []
+		self.__typeNames = []
+		self.__typeIndex = {}
+		self.__types = array.array('B')
+		self.__starts = array.array('l')
+		self.__ends = array.array('l')
+		self.__lines = array.array('l')
+		# Values that cannot be computed from the text
+		self.__values = {}
+		# (index of the next token, text, line number)
+		self.__directives = []
+		
+		if state is None:
+			self.__tokenize(lexer, lineno, reserved, reservedAnnotation, mergeTokens)
+		else:
+			self.__restore(state)
+		self.__tokens = self.__createTokens([(0, len(self.__types))])
+		
+		# Value of the token by type
+		strip = lambda value: value.strip()
+		literal = lambda value: value[1:-1]
+		keyword = lambda value: value[1:]
+		self.__convert = [None] * len(self.__typeNames)
+		for name, index in self.__typeIndex.items():
+			if name == 'INT':
+				self.__convert[index] = int
+			elif name == 'LITERAL':
+				self.__convert[index] = literal
+			elif name == 'ANNO_TEXT':
+				self.__convert[index] = strip
+			elif name == 'ANNO_KEYWORD' or name in reservedAnnotation.values():
+				self.__convert[index] = keyword
+				
+	def __report(self, message, stdout = False):
+		print(message, file=sys.stdout if stdout else sys.stderr)
+		self.__messages.append((stdout, message))
+		
+	def __setError(self):
+		self.__hasError = True
+		self.__error()
+		
+	def __restore(self, state):
+		(self.__typeNames, self.__types, self.__starts, self.__ends, self.__lines,
+			self.__values, self.__directives, self.__lineno, messages, hasError) = state
+		self.__typeIndex = {name: index for index, name in enumerate(self.__typeNames)}
+		for stdout, message in messages:
+			self.__report(message, stdout)
+		if hasError:
+			self.__setError()
+		
+	def state(self):
+		'''The tokens, directives and messages, but not the text'''
+		return (self.__typeNames, self.__types, self.__starts, self.__ends, self.__lines,
+			self.__values, self.__directives, self.__lineno, self.__messages, self.__hasError)
+	
+	def __type(self, name):
+		if not name in self.__typeIndex:
+			self.__typeIndex[name] = len(self.__typeNames)
+			self.__typeNames.append(name)
+		return self.__typeIndex[name]
+	
+	def __tokenize(self, lexer, lineno, reserved, reservedAnnotation, mergeTokens):
+		text = self.__text
+		types = self.__types
+		starts = self.__starts
+		ends = self.__ends
+		lines = self.__lines
+		values = self.__values
+		directives = self.__directives
+		typeOf = self.__type
+		
+		ID = typeOf('ID')
+		ANNO_KEYWORD = typeOf('ANNO_KEYWORD')
+		reserved = {word: typeOf(name) for word, name in reserved.items()}
+		reservedAnnotation = {word: typeOf(name) for word, name in reservedAnnotation.items()}
+		# Type of the first token -> type of the second token -> merged type
+		merge = {}
+		for name, others in mergeTokens.items():
+			merge[typeOf(name)] = {typeOf(other): typeOf(name + other) for other in others}
+		mergeable = set().union(*merge.values())
+		
+		sweeps = {}
+		for state in ('INITIAL', 'annotation'):
+			# PLY only splits the master regular expression for more than 100 rules
+			regex, index = lexer.lexstatere[state][0]
+			if state == 'INITIAL':
+				# Skip the spaces (t_ignore_SPACE) in the same match as the next token
+				regex = re.compile(r'[\ \t]*(?:' + regex.pattern + ')', regex.flags)
+			actions = [None] * len(index)
+			for i, rule in enumerate(index):
+				if rule is None:
+					# Not a rule
+					continue
+				name = rule[1]
+				if name is None:
+					actions[i] = (_BATCH_IGNORE, None)
+				elif name in _BATCH_ACTIONS:
+					actions[i] = (_BATCH_ACTIONS[name], typeOf(_BATCH_TYPES.get(name, name)))
+				else:
+					actions[i] = (_BATCH_TOKEN, typeOf(name))
+			sweeps[state] = (regex, actions)
+		
+		state = 'INITIAL'
+		pos = 0
+		length = len(text)
+		while pos < length:
+			regex, actions = sweeps[state]
+			for m in regex.finditer(text, pos):
+				if m.start() != pos:
+					# Nothing matches between pos and the match
+					for c in text[pos:m.start()]:
+						self.__report("Illegal character '%s'" % c)
+						self.__setError()
+				i = m.lastindex
+				start = m.start(i)
+				pos = m.end()
+				action, type = actions[i]
+				
+				if action == _BATCH_TOKEN:
+					pass
+				elif action == _BATCH_ID:
+					type = reserved.get(text[start:pos].lower(), ID)
+					if type in mergeable and types and types[-1] in merge \
+							and type in merge[types[-1]] and not len(types) - 1 in values:
+						values[len(types) - 1] = text[starts[-1]:ends[-1]] + ' ' + text[start:pos]
+						types[-1] = merge[types[-1]][type]
+						ends[-1] = pos
+						continue
+				elif action == _BATCH_IGNORE:
+					continue
+				elif action == _BATCH_NEW_LINE:
+					lineno += 1
+					continue
+				elif action == _BATCH_DIRECTIVE:
+					directives.append((len(types), text[start:pos], lineno))
+					lineno += 1
+					continue
+				elif action == _BATCH_COMMENT:
+					types.append(type)
+					starts.append(start)
+					ends.append(pos)
+					lines.append(lineno)
+					lineno += 1
+					continue
+				elif action == _BATCH_END_LINE:
+					types.append(type)
+					starts.append(start)
+					ends.append(pos)
+					lines.append(lineno)
+					lineno += pos - start
+					if state != 'INITIAL':
+						state = 'INITIAL'
+						break
+					continue
+				elif action == _BATCH_INT:
+					try:
+						int(text[start:pos])
+					except ValueError:
+						self.__report("Integer value too large %d " + text[start:pos], True)
+						values[len(types)] = 0
+				elif action == _BATCH_KEYWORD:
+					type = reservedAnnotation.get(text[start+1:pos].lower(), ANNO_KEYWORD)
+					if type == ANNO_KEYWORD:
+						self.__report("WARNING: Unknown anntation keyword '%s' in line %d" % (text[start+1:pos], lineno))
+				elif action == _BATCH_ANNOTATION:
+					types.append(type)
+					starts.append(start)
+					ends.append(pos)
+					lines.append(lineno)
+					state = 'annotation'
+					break
+				
+				types.append(type)
+				starts.append(start)
+				ends.append(pos)
+				lines.append(lineno)
+			else:
+				# No more matches
+				for c in text[pos:]:
+					self.__report("Illegal character '%s'" % c)
+					self.__setError()
+				pos = length
+			
+		self.__lineno = lineno
+		
+	@property
+	def lineno(self):
+		'''The line number at the end of the text'''
+		return self.__lineno
+	
+	def __len__(self):
+		return len(self.__types)
+		
+	def directives(self):
+		'''The preprocessor directives as tuples (index of the next token, text, line number)'''
+		return self.__directives
+		
+	def token(self):
+		return next(self.__tokens)
+	
+	def view(self, ranges):
+		'''Returns a lexer for the tokens in the ranges [start, end) of token indices
+		
+		Views share the token arrays, each of them creates its own LexToken
+		objects.'''
+		return _TokenView(self.__createTokens(ranges))
+	
+	def __createTokens(self, ranges):
+		'''Generates the LexToken objects, None after the last token'''
+		text = self.__text
+		typeNames = self.__typeNames
+		convert = self.__convert
+		values = self.__values
+		LexToken = lex.LexToken
+		for first, last in ranges:
+			for i, type, start, end, lineno in zip(range(first, last), self.__types[first:last],
+					self.__starts[first:last], self.__ends[first:last], self.__lines[first:last]):
+				token = LexToken()
+				token.type = typeNames[type]
+				if i in values:
+					token.value = values[i]
+				elif convert[type]:
+					token.value = convert[type](text[start:end])
+				else:
+					token.value = text[start:end]
+				token.lineno = lineno
+				token.lexpos = start
+				yield token
+		while True:
+			yield None
+
+class _TokenView:
+	'''A lexer for a subset of the tokens of a BatchLexer'''
+	
+	def __init__(self, tokens):
+		self.__tokens = tokens
+		
+	def token(self):
+		return next(self.__tokens)
+
 class FortranLexer:
 	
 	__reserved = {
@@ -136,9 +544,14 @@ class FortranLexer:
 		'ANNO_TEXT'
 	] + list(__reserved.values()) + list(__reserved_annotation.values())
 	
-	__hasError = False
-	
-	def __init__(self):
+	def __init__(self, cacheDir = None):
+		'''Creates the lexer
+		
+		If cacheDir is set, the lex table is stored in this directory and
+		reused as long as the rules and tokens do not change.'''
+		self.__hasError = False
+		self.__tokenCache = None
+		
 		tokens = self.__ignore_tokens + self.__tokens
 		
 		states = (
@@ -198,7 +611,7 @@ class FortranLexer:
 		t_OTHER = r'\*|\.|%|;|\+|-|(<=)'
 
 		def t_ID(t):
-			r'(?i)[a-z][a-z0-9_]*'
+			r'[a-zA-Z][a-zA-Z0-9_]*'
 			tlower = t.value.lower() # convert to lower case
 			if tlower in self.__reserved:
 				t.type = self.__reserved.get(tlower)
@@ -233,19 +646,62 @@ class FortranLexer:
 			return t
 
 		def t_ANY_error(t):
+			if t.lexer.incomplete and t.value[0] in '\'"':
+				# Closing quote might be in the next block
+				raise IncompleteInput()
 			print("Illegal character '%s'" % t.value[0], file=sys.stderr)
 			t.lexer.skip(1)
 			self.__hasError = True
 			
 		mergeTokens = {'END' : {'MODULE', 'SUBROUTINE'}} #, 'IF', 'DO', 'SELECT'}}
+		
+		if cacheDir:
+			rules = {name: rule for name, rule in locals().items() if name.startswith('t_')}
+			lextab = tables.loadTable(cacheDir, 'lextab_' + tables.signature(rules, tokens, states))
+			lexer = lex.lex(optimize=1, lextab=lextab, outputdir=cacheDir)
+		else:
+			lexer = lex.lex()
 			
-		self.__lexer = MergeLexer(lex.lex(), mergeTokens)
+		lexer.incomplete = False
+		self.__mergeTokens = mergeTokens
+		self.__lexer = MergeLexer(lexer, mergeTokens)
 		self.__tokens = list(set(self.__tokens + self.__lexer.virtualTokens)) # Add virtual tokens from the merger
 		self.__tokens = [t for t in self.__tokens if not t in {'END', 'ANNO_KEYWORD'}] # Not interesting for yacc
 		
+	def reset(self, lineno = 1):
+		'''Resets the error flag and the state of the lexer for a new input'''
+		self.__hasError = False
+		self.__lexer.begin('INITIAL')
+		self.__lexer.lineno = lineno
+		self.__lexer.incomplete = False
+		self.__lexer._buffer.clear()
+		
 	def lexer(self):
 		return self.__lexer
 	
+	def setTokenCache(self, tokenCache):
+		'''Stores the tokens of the BatchLexer in a tokencache.TokenCache (None disables it)'''
+		self.__tokenCache = tokenCache
+		
+	def batchLexer(self, text, lineno = 1):
+		'''Returns a BatchLexer for the text
+		
+		With a token cache, texts that were tokenized before are not
+		tokenized again.'''
+		state = self.__tokenCache.load(text, lineno) if self.__tokenCache else None
+		tokens = BatchLexer(self.__lexer, text, lineno, self.__reserved, self.__reserved_annotation,
+			self.__mergeTokens, self.__setError, state)
+		if self.__tokenCache and state is None:
+			self.__tokenCache.store(text, lineno, tokens.state())
+		return tokens
+	
+	def __setError(self):
+		self.__hasError = True
+		
+	def streamLexer(self, f, blockSize = BLOCK_SIZE):
+		'''Returns a lexer that reads the tokens lazily from the file object f'''
+		return MergeLexer(StreamLexer(self.__lexer, f, blockSize), self.__mergeTokens)
+	
 	def tokens(self):
 		return self.__tokens
 		
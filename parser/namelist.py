@@ -38,53 +38,144 @@
 # @section DESCRIPTION
 #
 
-import copy
-import itertools
+import array
+import bisect
 import re
 import textwrap
 
 class Type:
-	def __init__(self, type):
-		self.__type = type.lower()
+	'''An immutable variable type
+	
+	Types are interned: equal types are the same object and are shared by
+	all defines. Use modified() to get a type with other attributes.'''
+	
+	__slots__ = ('__type', '__length', '__dimension')
+	
+	# All types created so far
+	__types = {}
+	
+	def __new__(cls, type, length = None, dimension = None):
+		key = (type.lower(), length, dimension)
+		self = cls.__types.get(key)
+		if self is None:
+			self = object.__new__(cls)
+			object.__setattr__(self, '_Type__type', key[0])
+			object.__setattr__(self, '_Type__length', length)
+			object.__setattr__(self, '_Type__dimension', dimension)
+			cls.__types[key] = self
+		return self
+	
+	def __setattr__(self, name, value):
+		raise AttributeError("'Type' object is immutable")
+	
+	def __reduce__(self):
+		# Keep the types interned when unpickling
+		return (Type, (self.__type, self.__length, self.__dimension))
+	
+	def modified(self, length = None, dimension = None):
+		'''Returns the type with the given attributes replaced'''
+		if length is None:
+			length = self.__length
+		if dimension is None:
+			dimension = self.__dimension
+		return Type(self.__type, length, dimension)
 		
 	def type(self):
 		return self.__type
+	
+	@property
+	def length(self):
+		if self.__length is None:
+			raise AttributeError("Type '%s' has no length" % self.__type)
+		return self.__length
+	
+	@property
+	def dimension(self):
+		if self.__dimension is None:
+			raise AttributeError("Type '%s' has no dimension" % self.__type)
+		return self.__dimension
 		
 	def hasLength(self):
-		return hasattr(self, 'length')
+		return self.__length is not None
 	
 	def hasDimension(self):
-		return hasattr(self, 'dimension')
+		return self.__dimension is not None
 	
 	def __str__(self):
 		if self.hasLength():
-			return self.__type + '(len=' + str(self.length) + ')'
+			return self.__type + '(len=' + str(self.__length) + ')'
 		return self.__type
 
+# Shared TextWrapper objects by width
+_wrappers = dict()
+
+def _wrapper(width):
+	if not width in _wrappers:
+		_wrappers[width] = textwrap.TextWrapper(width)
+	return _wrappers[width]
+
 class Annotation:
-	def __init__(self, text):
-		self.__text = text
+	'''The documentation of a declaration
+	
+	Continuation lines are collected as fragments and only joined when the
+	text is needed. The formatted text is cached for each width, the same
+	annotation is usually shared by all parameters of a declaration.'''
+	
+	def __init__(self, text, keyword = None, content = None):
+		self.__fragments = [text]
+		# Keyword of the last section
+		self.__keyword = keyword
+		self.__allowedValues = [content] if keyword == 'allowed_values' else None
+		# width -> formatted text
+		self.__formatted = dict()
 		
 	def append(self, annotation):
-		if annotation.__text:
-			self.__text += ' ' + annotation.__text
-		
-	def format(self):
-		wrapper = textwrap.TextWrapper()
-		def noEmptyList(l):
-			if not l:
-				return ['']
-			return l
-		
-		text_lines = map(lambda s: noEmptyList(wrapper.wrap(s.strip())), self.__text.splitlines())
-		return '! ' + '\n! '.join(itertools.chain.from_iterable(text_lines))
+		text = annotation.text()
+		if text:
+			self.__fragments.append(text)
+			self.__formatted.clear()
+		
+		if annotation.__keyword:
+			self.__keyword = annotation.__keyword
+			if annotation.__allowedValues is not None:
+				self.__allowedValues = [annotation.allowedValues()]
+		elif not text.strip():
+			# An empty line ends the section
+			self.__keyword = None
+		elif self.__keyword == 'allowed_values':
+			self.__allowedValues.append(text)
+			
+	def text(self):
+		if len(self.__fragments) > 1:
+			self.__fragments = [' '.join(self.__fragments)]
+		return self.__fragments[0]
+	
+	def allowedValues(self):
+		'''The text of the @allowed_values section or None'''
+		if self.__allowedValues is None:
+			return None
+		if len(self.__allowedValues) > 1:
+			self.__allowedValues = [' '.join(self.__allowedValues)]
+		return self.__allowedValues[0]
+		
+	def format(self, width = 70):
+		if not width in self.__formatted:
+			wrapper = _wrapper(width)
+			lines = []
+			for line in self.text().splitlines():
+				lines.extend(wrapper.wrap(line.strip()) or [''])
+			self.__formatted[width] = '! ' + '\n! '.join(lines)
+		return self.__formatted[width]
 
 class Define:
-	__size = 1
-	__annotation = None
+	__slots__ = ('__type', '__size', '__annotation', '__allowedValues')
 	
 	def __init__(self, type):
-		self.__type = copy.deepcopy(type)
+		# Types are immutable and can be shared
+		self.__type = type
+		self.__size = 1
+		self.__annotation = None
+		self.__allowedValues = None
 		
 	def setSize(self, size):
 		self.__size = size
@@ -100,94 +191,230 @@ class Define:
 		
 	def annotation(self):
 		return self.__annotation
+	
+	def setAllowedValues(self, allowedValues):
+		self.__allowedValues = allowedValues
+		
+	def allowedValues(self):
+		'''The compiled constraint (constraints.AllowedValues) or None'''
+		return self.__allowedValues
+
+def _resolveRanges(ranges, size):
+	'''Resolves assigned ranges to disjoint segments
+	
+	ranges is a list of tuples (value, start, end) in the order of the
+	assignments. The first assignment to an element wins. Returns a sorted
+	list of tuples (start, end, value) that covers [0, size). Elements
+	without an assignment get the value None.'''
+	starts = []
+	segments = []
+	covered = 0
+	for value, rangeStart, rangeEnd in ranges:
+		rangeStart = max(rangeStart, 0)
+		rangeEnd = min(rangeEnd, size)
+		if rangeStart >= rangeEnd:
+			continue
+		
+		# Fill the gaps between the existing segments in [rangeStart, rangeEnd)
+		i = bisect.bisect_right(starts, rangeStart)
+		if i > 0 and segments[i-1][1] > rangeStart:
+			rangeStart = segments[i-1][1]
+		while rangeStart < rangeEnd:
+			if i < len(segments) and segments[i][0] <= rangeStart:
+				rangeStart = segments[i][1]
+				i += 1
+				continue
+			gapEnd = rangeEnd
+			if i < len(segments):
+				gapEnd = min(gapEnd, segments[i][0])
+			starts.insert(i, rangeStart)
+			segments.insert(i, (rangeStart, gapEnd, value))
+			covered += gapEnd - rangeStart
+			rangeStart = gapEnd
+			i += 1
+		
+		if covered == size:
+			# Later assignments cannot change anything
+			break
+	
+	# Add the unassigned elements
+	result = []
+	last = 0
+	for segment in segments:
+		if segment[0] > last:
+			result.append((last, segment[0], None))
+		result.append(segment)
+		last = segment[1]
+	if last < size:
+		result.append((last, size, None))
+	return result
+
+class Diagnostics:
+	'''The checked default values of a parameter
+	
+	Computed once when the parameter is bound to its define and assigns.'''
+	
+	__slots__ = ('__hasValues', '__hasAllValues', '__hasCorrectValueType', '__values', '__runs', '__warnings')
+	
+	def __init__(self, hasValues, hasAllValues, hasCorrectValueType, values, runs, warnings):
+		self.__hasValues = hasValues
+		self.__hasAllValues = hasAllValues
+		self.__hasCorrectValueType = hasCorrectValueType
+		self.__values = values
+		self.__runs = runs
+		self.__warnings = warnings
+		
+	def hasValues(self):
+		return self.__hasValues
+	
+	def hasAllValues(self):
+		return self.__hasAllValues
+	
+	def hasCorrectValueType(self):
+		return self.__hasCorrectValueType
+	
+	def values(self):
+		'''The converted values of all elements
+		
+		Integer and real values are stored in an array, other values in a list.'''
+		return self.__values
+	
+	def runs(self):
+		'''The converted values as tuples (count, value) of equal consecutive elements'''
+		return self.__runs
+	
+	def warnings(self):
+		return self.__warnings
 
 class Parameter:
-	__valueList = None
+	__slots__ = ('__name', '__lname', '__define', '_values', '__diagnostics')
+	
+	# Typecodes of the value buffers
+	__typecodes = {'integer': 'q', 'real': 'd'}
 	
 	def __init__(self, name):
 		self.__name = name
+		self.__lname = name.lower()
+		self.__diagnostics = None
 		
 	def name(self):
 		return self.__name
 	
 	def lname(self):
-		return self.__name.lower()
+		return self.__lname
+	
+	def bind(self, define, values = None):
+		'''Sets the define and the assigned values and checks them'''
+		self.__define = define
+		if values is not None:
+			self._values = values
+		self.__diagnostics = self.__diagnose()
 	
 	def setDefine(self, define):
 		self.__define = define
+		self.__diagnostics = None
 		
 	def define(self):
 		return self.__define
 	
 	def setValues(self, values):
 		self._values = values
+		self.__diagnostics = None
 		
-	def values(self):
-		self.__createValueList()
+	def diagnostics(self):
+		if self.__diagnostics is None:
+			self.__diagnostics = self.__diagnose()
+		return self.__diagnostics
 		
-		t = self.__define.type().type()
-		def convert(value):
-			if value == None:
-				if t == 'integer':
-					return 0
-				if t == 'real':
-					return 0.0
-				if t == 'character':
-					return "''"
-				return ''
-		
-			if t == 'integer':
-				return int(value)
-			if t == 'real':
-				return float(value)
-			if t == 'character':
-				return "'" + str(value) + "'"
-			return value
-		
-		return map(convert, self.__valueList)
+	def values(self):
+		'''Returns an iterator over the default values of all elements'''
+		return iter(self.diagnostics().values())
 		
 	def hasValues(self):
 		return hasattr(self, '_values')
 	
+	def assignments(self):
+		'''Returns the assigned (value, start, end) ranges in source order'''
+		return self._values if self.hasValues() else []
+	
 	def hasAllValues(self):
-		self.__createValueList()
-		return not None in self.__valueList
+		return self.diagnostics().hasAllValues()
 	
 	def hasCorrectValueType(self):
-		self.__createValueList()
-		
+		return self.diagnostics().hasCorrectValueType()
+	
+	def __diagnose(self):
 		t = self.__define.type().type()
-		for value in self.__valueList:
-			if t == 'integer':
-				if isinstance(value, int):
-					return True
-				elif isinstance(value, float):
-					print("Warning: Converting float expression to integer type for '%s'" % self.__name)
-					return True
-				return False
-			if t == 'real':
-				if isinstance(value, (int, float)):
-					return True
-				return False
-			if t == 'character':
-				if isinstance(value, str):
-					return True
-				return False
-			return True
-	
-	def __createValueList(self):
-		if self.__valueList:
-			return
-		
-		self.__valueList = [None] * self.__define.size()
-		
-		if self.hasValues():
-			for value,start,end  in self._values:
-				for i in range(start, min(end, len(self.__valueList))):
-					if self.__valueList[i] == None:
-						self.__valueList[i] = value
+		ranges = self.assignments()
+		segments = _resolveRanges(ranges, self.__define.size())
+		warnings = []
+		
+		hasAllValues = all(value is not None for _,_,value in segments)
+		
+		# Check the type of all assigned values
+		values = [value for _,_,value in segments if value is not None]
+		if t not in ('integer', 'real', 'character'):
+			hasCorrectValueType = True
+		elif not values:
+			hasCorrectValueType = False
+		elif t == 'character':
+			hasCorrectValueType = all(isinstance(value, str) for value in values)
+		else:
+			hasCorrectValueType = all(isinstance(value, (int, float)) for value in values)
+			if hasCorrectValueType and t == 'integer' and not all(isinstance(value, int) for value in values):
+				warnings.append("Warning: Converting float expression to integer type for '%s'" % self.__name)
+		
+		runs = self.__createRuns(t, segments)
+		return Diagnostics(self.hasValues(), hasAllValues, hasCorrectValueType,
+			self.__createBuffer(t, runs), runs, warnings)
+	
+	def __createRuns(self, t, segments):
+		if t == 'integer':
+			default, convert = 0, int
+		elif t == 'real':
+			default, convert = 0.0, float
+		elif t == 'character':
+			default, convert = "''", lambda value: "'" + str(value) + "'"
+		else:
+			default, convert = '', lambda value: value
+		
+		def convertSafe(value):
+			if value is None:
+				return default
+			try:
+				return convert(value)
+			except ValueError:
+				# Reported by hasCorrectValueType
+				return value
+		
+		runs = []
+		for start, end, value in segments:
+			value = convertSafe(value)
+			if runs and runs[-1][1] == value and type(runs[-1][1]) is type(value):
+				runs[-1] = (runs[-1][0] + end - start, value)
+			else:
+				runs.append((end - start, value))
+		return runs
+	
+	def __createBuffer(self, t, runs):
+		if t in self.__typecodes:
+			try:
+				buffer = array.array(self.__typecodes[t])
+				for count, value in runs:
+					buffer.extend(array.array(buffer.typecode, [value]) * count)
+				return buffer
+			except (OverflowError, TypeError):
+				# Integer too large or value not converted
+				pass
+		
+		buffer = []
+		for count, value in runs:
+			buffer.extend([value] * count)
+		return buffer
 
 class Namelist:
+	__slots__ = ('__name', '__parameters')
+	
 	def __init__(self, name, parameters):
 		self.__name = name
 		self.__parameters = parameters
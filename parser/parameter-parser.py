@@ -39,78 +39,225 @@
 #
 
 
+import argparse
+import asyncio
+import cProfile
+import json
+import os
 import sys
+import tracemalloc
 
+import emit
+import extract
+import incremental
+import preprocessor
+import service
+import tables
+import tokencache
+import watch
 from lexer import FortranLexer
-from yacc import FortranYacc
+from stats import Stats
 
-def generateParameterFile(filename, namelists):
-	nodefault = 0
+def generateParameterFile(filename, namelists, emitters = (), repeat = False):
+	'''Writes the parameter file and the output of other emitters in one pass
 	
-	f = open(filename, 'w')
+	With repeat, equal array elements are written as n*value. Returns True
+	if the parameter file changed.'''
+	parameterFile = emit.ParameterFileEmitter(filename, repeat)
+	emit.emit(namelists, [parameterFile] + list(emitters))
 	
-	for namelist in namelists:
-		f.write('!-----------------------------\n')
-		f.write('&%s\n' % namelist.name())
-		f.write('!-----------------------------\n')
-		
-		for parameter in namelist.parameters():
-			f.write('\n')
-			
-			define = parameter.define()
-			type = define.type()
-			
-			if define.annotation():
-				f.write('%s\n' % define.annotation().format())
+	if parameterFile.noDefault() > 0:
+		print("Found %d parameters without a default value" % parameterFile.noDefault(), file=sys.stderr)
+	return parameterFile.changed()
+	
+def variantFilename(filename, variant):
+	'''Inserts the name of the variant before the extension'''
+	root, extension = os.path.splitext(filename)
+	return '%s.%s%s' % (root, variant, extension)
 
-			if type.type() == 'character' and type.hasLength():
-				f.write('! Max length: %d\n' % type.length)
-			
-			if type.hasDimension():
-				if type.dimension == 'inf':
-					f.write('! WARNING: Dimension set at runtime\n')
-				else:
-					f.write('! Dimension size: %d\n', type.dimension)
-			
-			if not parameter.hasValues():
-				f.write('! WARNING: Default value not found\n')
-				nodefault += 1
+def exitCode(results, duplicates):
+	'''Returns the exit code for the results of all files'''
+	if any(result.hasLexError() for result in results):
+		return 1
+	if any(result.hasParseError() for result in results):
+		return 2
+	if duplicates:
+		return 3
+	return 0
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Generates a default parameter file from the namelists in SeisSol Fortran sources')
+	argParser.add_argument('inputs', nargs='*', default=['../SeisSol/src/Reader/readpar.f90'],
+		help='Fortran source files or glob patterns (default: %(default)s)')
+	argParser.add_argument('-o', '--output', default='parameters.par',
+		help='parameter file to generate (default: %(default)s)')
+	argParser.add_argument('-j', '--jobs', type=int, default=None,
+		help='number of worker processes (default: number of cores)')
+	argParser.add_argument('--no-cache', action='store_true',
+		help='do not store the parse tables in the user cache directory')
+	argParser.add_argument('--incremental', action='store_true',
+		help='only parse subroutines that changed since the last run')
+	argParser.add_argument('--prefilter', action='store_true',
+		help='remove statements that are not relevant for namelists before parsing')
+	argParser.add_argument('--repeat-counts', action='store_true',
+		help='write runs of equal array elements as n*value')
+	argParser.add_argument('--token-cache', action='store_true',
+		help='store the tokens of the inputs in the cache directory and reuse them in later runs (implies --batch-lexer)')
+	argParser.add_argument('--batch-lexer', action='store_true',
+		help='tokenize each file at once before parsing (faster for large files)')
+	argParser.add_argument('--schema', metavar='FILE',
+		help='also write the namelists to a schema file for other tools')
+	argParser.add_argument('--stats', metavar='FILE',
+		help='write timings, token counts and parser events as JSON (- for stdout)')
+	argParser.add_argument('--tracemalloc', action='store_true',
+		help='measure the allocated memory of each phase in --stats')
+	argParser.add_argument('--profile', metavar='FILE',
+		help='write cProfile results of the main process (use -j 1 to include the parser)')
+	argParser.add_argument('--tokens', action='store_true',
+		help='only print the tokens of the inputs')
+	argParser.add_argument('-e', '--emit', metavar='FORMAT=FILE', action='append', default=[],
+		help='also write another format (%s), can be repeated' % ', '.join(emit.EMITTERS))
+	argParser.add_argument('--watch', action='store_true',
+		help='keep running and regenerate the outputs whenever the inputs change')
+	argParser.add_argument('--serve', metavar='SOCKET',
+		help='keep running and answer schema queries on a Unix socket (see service.SchemaService)')
+	argParser.add_argument('--variant', metavar='NAME=MACROS', action='append', default=[],
+		help='generate the outputs for a configuration of preprocessor macros (comma separated NAME[=VALUE]), can be repeated; the name of the variant is added to the output files')
+	argParser.add_argument('--interval', type=float, default=1.0,
+		help='seconds between two checks of the inputs in --watch and --serve mode (default: %(default)s)')
+	args = argParser.parse_args()
+	if args.incremental and args.no_cache:
+		argParser.error('--incremental cannot be used with --no-cache')
+	if args.token_cache and (args.incremental or args.no_cache):
+		argParser.error('--token-cache cannot be used with --incremental or --no-cache')
+	if args.watch and args.serve:
+		argParser.error('--watch cannot be used with --serve')
+	if (args.watch or args.serve) and (args.stats or args.profile or args.tracemalloc):
+		argParser.error('--watch and --serve cannot be used with --stats, --profile or --tracemalloc')
+	if args.variant and (args.watch or args.serve or args.incremental or args.prefilter):
+		argParser.error('--variant cannot be used with --watch, --serve, --incremental or --prefilter')
+	if args.variant and (args.stats or args.profile or args.tracemalloc or args.tokens):
+		argParser.error('--variant cannot be used with --stats, --profile, --tracemalloc or --tokens')
+	variants = dict()
+	for value in args.variant:
+		name, _, macros = value.partition('=')
+		try:
+			if not name or name in variants:
+				raise ValueError()
+			variants[name] = preprocessor.parseMacros(macros)
+		except ValueError:
+			argParser.error("invalid --variant '%s'" % value)
+	emitters = []
+	for value in args.emit:
+		format, _, filename = value.partition('=')
+		if not format in emit.EMITTERS or not filename:
+			argParser.error("invalid --emit '%s'" % value)
+		emitters.append((emit.EMITTERS[format], filename))
+	if args.schema:
+		emitters.append((emit.SchemaEmitter, args.schema))
+	
+	cacheDir = None if args.no_cache else tables.cacheDirectory()
+	# The caches grow with every edit of the sources
+	if args.incremental:
+		incremental.pruneCache(cacheDir)
+	if args.token_cache:
+		tokencache.pruneCache(cacheDir)
+	filenames = extract.expandInputs(args.inputs)
+	
+	if args.tokens:
+		lexer = FortranLexer(cacheDir)
+		for filename in filenames:
+			f = open(filename)
+			if args.batch_lexer:
+				tokens = lexer.batchLexer(f.read())
 			else:
-				if not parameter.hasAllValues():
-					f.write('! WARNING: Not all default values set in array\n')
-				if not parameter.hasCorrectValueType():
-					f.write('! ERROR: Invalid convertion for default value to %s\n' % type.type())
-				
-			values = ' '.join(map(str, parameter.values()))
-			f.write('%s = %s\n' % (parameter.name(), values))
-			
-		f.write('/\n\n')
+				tokens = lexer.lexer()
+				tokens.input(f.read())
+			f.close()
+			while True:
+				tok = tokens.token()
+				if not tok:
+					break;
+				print(tok)
+		sys.exit(0)
 	
-	f.close()
+	if args.watch:
+		# Keeps the lexer and the parser for all runs
+		parse = extract.createParser(cacheDir, args.incremental, args.prefilter,
+			batch=args.batch_lexer, tokenCache=args.token_cache)
+		def generate(results):
+			namelists, duplicates = extract.mergeNamelists(results)
+			outputs = [Emitter(filename) for Emitter, filename in emitters]
+			if generateParameterFile(args.output, namelists, outputs, args.repeat_counts):
+				print('Updated %s' % args.output)
+		
+		try:
+			watch.Watcher(args.inputs, parse, generate, args.interval).run()
+		except KeyboardInterrupt:
+			pass
+		sys.exit(0)
 	
-	if nodefault > 0:
-		print("Found %d parameters without a default value" % nodefault)
+	if args.serve:
+		parse = extract.createParser(cacheDir, args.incremental, args.prefilter,
+			batch=args.batch_lexer, tokenCache=args.token_cache)
+		try:
+			asyncio.run(service.SchemaService(args.inputs, parse, args.interval).serve(args.serve))
+		except OSError as e:
+			print('ERROR: %s' % e, file=sys.stderr)
+			sys.exit(1)
+		except KeyboardInterrupt:
+			pass
+		sys.exit(0)
 	
-if __name__ == '__main__':
-	lexer = FortranLexer()
-	yacc = FortranYacc(lexer.tokens())
+	if variants:
+		# Tokenizes every file only once for all variants
+		results = extract.parseVariants(filenames, variants, args.jobs, cacheDir, args.token_cache)
+		duplicates = []
+		for name, variantResults in results.items():
+			namelists, variantDuplicates = extract.mergeNamelists(variantResults)
+			duplicates.extend(variantDuplicates)
+			outputs = [Emitter(variantFilename(filename, name)) for Emitter, filename in emitters]
+			generateParameterFile(variantFilename(args.output, name), namelists, outputs, args.repeat_counts)
+		sys.exit(exitCode([result for variantResults in results.values() for result in variantResults], duplicates))
+	
+	output = sys.stdout
+	if args.stats == '-':
+		# Only the JSON document goes to stdout, the messages of the parser go to stderr
+		sys.stdout = sys.stderr
+	
+	if args.tracemalloc:
+		tracemalloc.start()
+	if args.profile:
+		profiler = cProfile.Profile()
+		profiler.enable()
 	
-	f = open('../SeisSol/src/Reader/readpar.f90')
-	if False:
-	#if True:
-		lexer.lexer().input(f.read())
-		while True:
-			tok = lexer.lexer().token()
-			if not tok:
-				break;
-			print(tok)
-	else:
-		yacc.parse(f.read(), lexer)
-	f.close()
+	total = Stats()
+	with total.phase('total'):
+		results = extract.parseFiles(filenames, args.jobs, cacheDir, args.incremental, args.prefilter,
+			args.stats is not None, args.tracemalloc, args.batch_lexer, args.token_cache)
+		with total.phase('merge'):
+			namelists, duplicates = extract.mergeNamelists(results)
+		
+		with total.phase('emit'):
+			outputs = [Emitter(filename) for Emitter, filename in emitters]
+			generateParameterFile(args.output, namelists, outputs, args.repeat_counts)
+	
+	if args.profile:
+		profiler.disable()
+		profiler.dump_stats(args.profile)
 	
-	generateParameterFile('parameters.par', yacc.namelists())
+	if args.stats:
+		total.count('files', len(results))
+		total.count('namelists', len(namelists))
+		total.count('parameters', sum(len(namelist.parameters()) for namelist in namelists))
+		for result in results:
+			total.merge(result.stats())
+		
+		if args.stats == '-':
+			json.dump(total.toDict(), output, indent='\t')
+			print(file=output)
+		else:
+			with open(args.stats, 'w') as f:
+				json.dump(total.toDict(), f, indent='\t')
 	
-	if (lexer.hasError()):
-		sys.exit(1)
-	if (yacc.hasError()):
-		sys.exit(2)
\ No newline at end of file
+	sys.exit(exitCode(results, duplicates))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import argparse
+import sys
+
+import extract
+import schema
+import tables
+import validate
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Checks parameter files against the namelists in SeisSol Fortran sources')
+	argParser.add_argument('files', nargs='+',
+		help='parameter files or directories containing *.par files')
+	argParser.add_argument('-s', '--sources', nargs='+', default=['../SeisSol/src/Reader/readpar.f90'],
+		help='Fortran source files or glob patterns (default: %(default)s)')
+	argParser.add_argument('--schema', metavar='FILE',
+		help='schema file written by parameter-parser.py, used instead of the sources')
+	argParser.add_argument('-j', '--jobs', type=int, default=None,
+		help='number of worker processes (default: number of cores)')
+	argParser.add_argument('--no-cache', action='store_true',
+		help='do not store the parse tables in the user cache directory')
+	args = argParser.parse_args()
+	
+	if args.schema:
+		try:
+			namelists = schema.readSchema(args.schema)
+		except (OSError, schema.SchemaError) as e:
+			print('ERROR: %s' % e, file=sys.stderr)
+			sys.exit(1)
+	else:
+		cacheDir = None if args.no_cache else tables.cacheDirectory()
+		results = extract.parseFiles(extract.expandInputs(args.sources), args.jobs, cacheDir)
+		if any(result.hasLexError() or result.hasParseError() for result in results):
+			print('ERROR: Could not parse the Fortran sources', file=sys.stderr)
+			sys.exit(1)
+		namelists, _ = extract.mergeNamelists(results)
+	compiled = validate.Schema(namelists)
+	
+	files = 0
+	invalid = 0
+	for report in validate.validateFiles(validate.findParameterFiles(args.files), compiled, args.jobs):
+		files += 1
+		if report.hasIssues():
+			invalid += 1
+			for kind, _, _, message in report.issues():
+				print('%s: ERROR: %s' % (report.filename(), message))
+	
+	print('Checked %d files, %d with errors' % (files, invalid), file=sys.stderr)
+	if invalid:
+		sys.exit(4)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import locale
+import mmap
+import re
+
+from namelist import Define, Namelist, Parameter, Type
+
+class FormatError(Exception):
+	pass
+
+# Start of a namelist, the format has one per line
+_namelistStart = re.compile(rb'^[ \t]*&([a-zA-Z][a-zA-Z0-9_]*)', re.MULTILINE)
+
+_token = re.compile(rb'''
+	[ \t\r\n,]+                       # whitespace and separators
+	| (?P<comment>![^\n]*)
+	| (?P<end>/)
+	| (?P<key>[a-zA-Z][a-zA-Z0-9_]*)[ \t]*=
+	| (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+	| (?P<repeat>[0-9]+)\*(?=['"])    # repeat count of a string
+	| (?P<values>[^ \t\r\n,/!'"=]+     # unquoted values up to the next key
+		(?:[ \t,]+(?![a-zA-Z][a-zA-Z0-9_]*[ \t]*=)[^ \t\r\n,/!'"=]+)*)
+	''', re.VERBOSE)
+
+_separator = re.compile(r'[ \t,]+')
+_int = r'[+-]?[0-9]+'
+_float = r'[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eEdD]))(?:[eEdD][+-]?[0-9]+)?'
+_ints = re.compile(_int + r'(?:[ \t,]+' + _int + r')*\Z')
+_floats = re.compile(_float + r'(?:[ \t,]+' + _float + r')*\Z')
+_logical = {'.true.': True, '.t.': True, '.false.': False, '.f.': False}
+
+def _expand(converted, counts):
+	'''Repeats the converted values by their repeat count'''
+	values = []
+	for value, count in zip(converted, counts):
+		values.extend([value] * count)
+	return values
+
+def _convert(text):
+	'''Converts a line of unquoted values
+	
+	Values might have a repeat count (n*value). Returns the values and their
+	type.'''
+	if '*' in text:
+		counts = []
+		values = []
+		for value in _separator.split(text):
+			count, _, value = value.rpartition('*')
+			if count and (not count.isdigit() or not value):
+				raise ValueError(count + '*' + value)
+			counts.append(int(count) if count else 1)
+			values.append(value)
+		converted, valueType = _convert(' '.join(values))
+		return _expand(converted, counts), valueType
+	
+	values = _separator.split(text)
+	if _ints.match(text):
+		return list(map(int, values)), 'integer'
+	if _floats.match(text):
+		return [float(value.replace('d', 'e').replace('D', 'e')) for value in values], 'real'
+	
+	if all(value.lower() in _logical for value in values):
+		return [_logical[value.lower()] for value in values], 'logical'
+	
+	# Mixed integer and real values
+	for value in values:
+		if not re.fullmatch(_int, value) and not re.fullmatch(_float, value):
+			raise ValueError(value)
+	return [float(value.replace('d', 'e').replace('D', 'e')) for value in values], 'real'
+
+def _createParameter(name, values, types):
+	'''Creates a parameter with a define derived from the values'''
+	for typeName in ('character', 'real', 'integer', 'logical'):
+		if typeName in types:
+			break
+	else:
+		# No values
+		typeName = 'character'
+	
+	define = Define(Type(typeName))
+	define.setSize(len(values))
+	
+	# One range per run of equal values
+	ranges = []
+	start = 0
+	for i in range(1, len(values) + 1):
+		if i == len(values) or values[i] != values[start] or type(values[i]) is not type(values[start]):
+			ranges.append((values[start], start, i))
+			start = i
+	
+	parameter = Parameter(name)
+	parameter.bind(define, ranges)
+	return parameter
+
+class ParameterFile:
+	'''Reads parameter files in the format written by parameter-parser.py
+	
+	The file is memory-mapped and only scanned for the start of the namelists
+	when it is opened. A namelist is parsed when it is requested. The types
+	of the parameters are derived from the values.'''
+	
+	def __init__(self, filename, encoding = None, data = None):
+		'''If data (bytes) is given, it is read instead of the file, the
+		filename is only used in error messages.'''
+		self.__filename = filename
+		self.__encoding = encoding or locale.getpreferredencoding(False)
+		
+		if data is not None:
+			self.__data = data
+		else:
+			with open(filename, 'rb') as f:
+				try:
+					self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+				except (OSError, ValueError):
+					# Empty file or no regular file
+					self.__data = f.read()
+		
+		# Offsets of the namelists by lower case name
+		self.__index = {}
+		self.__names = []
+		for match in _namelistStart.finditer(self.__data):
+			name = match.group(1).decode('ascii')
+			if name.lower() in self.__index:
+				raise FormatError("Namelist '%s' defined twice in '%s'" % (name, filename))
+			self.__index[name.lower()] = (name, match.end())
+			self.__names.append(name)
+			
+		self.__namelists = {}
+		
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *args):
+		self.close()
+		
+	def close(self):
+		if isinstance(self.__data, mmap.mmap):
+			self.__data.close()
+		
+	def filename(self):
+		return self.__filename
+	
+	def names(self):
+		'''The names of all namelists in the order of the file'''
+		return list(self.__names)
+	
+	def hasNamelist(self, name):
+		return name.lower() in self.__index
+	
+	def namelist(self, name):
+		'''Returns the namelist (case insensitive)
+		
+		Raises KeyError if the file contains no such namelist.'''
+		lname = name.lower()
+		if lname not in self.__namelists:
+			self.__namelists[lname] = self.__parse(*self.__index[lname])
+		return self.__namelists[lname]
+	
+	def namelists(self):
+		'''Iterates over all namelists, parsing them on demand'''
+		for name in self.__names:
+			yield self.namelist(name)
+	
+	def __lineno(self, pos):
+		return self.__data[:pos].count(b'\n') + 1
+	
+	def __parse(self, name, pos):
+		data = self.__data
+		parameters = {}
+		key = None
+		values = []
+		types = set()
+		repeat = 1
+		while True:
+			match = _token.match(data, pos)
+			if not match:
+				if pos >= len(data):
+					raise FormatError("Namelist '%s' not terminated in '%s'" % (name, self.__filename))
+				raise FormatError("Invalid value in line %d of '%s'" % (self.__lineno(pos), self.__filename))
+			pos = match.end()
+			
+			kind = match.lastgroup
+			if kind is None or kind == 'comment':
+				continue
+			
+			if kind in ('key', 'end'):
+				if key is not None:
+					# Later assignments overwrite earlier ones
+					parameters.pop(key.lower(), None)
+					parameters[key.lower()] = _createParameter(key, values, types)
+				if kind == 'end':
+					break
+				key = match.group('key').decode('ascii')
+				values = []
+				types = set()
+				continue
+			
+			if key is None:
+				raise FormatError("Value without parameter in line %d of '%s'" % (self.__lineno(match.start()), self.__filename))
+			
+			text = match.group(kind).decode(self.__encoding)
+			if kind == 'repeat':
+				repeat = int(text)
+			elif kind == 'string':
+				quote = text[0]
+				values.extend([text[1:-1].replace(quote + quote, quote)] * repeat)
+				types.add('character')
+				repeat = 1
+			else:
+				try:
+					converted, valueType = _convert(text)
+				except ValueError as e:
+					raise FormatError("Invalid value '%s' in line %d of '%s'" % (e, self.__lineno(match.start()), self.__filename))
+				values.extend(converted)
+				types.add(valueType)
+		
+		return Namelist(name, list(parameters.values()))
+
+def readParameterFile(filename):
+	'''Returns all namelists of a parameter file'''
+	with ParameterFile(filename) as f:
+		return list(f.namelists())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import emit
+import tables
+from lexer import FortranLexer
+from synthetic import generateSource
+from yacc import FortranYacc
+
+def lex(text, lexer):
+	'''Returns the number of tokens and statements'''
+	lexer.reset()
+	lexer.lexer().input(text)
+	tokens = 0
+	statements = 0
+	while True:
+		token = lexer.lexer().token()
+		if not token:
+			break
+		tokens += 1
+		if token.type == 'END_LINE':
+			statements += 1
+	return tokens, statements
+
+def batchLex(text, lexer):
+	'''Returns the number of tokens of the lexer.BatchLexer'''
+	lexer.reset()
+	tokens = lexer.batchLexer(text)
+	count = 0
+	while tokens.token():
+		count += 1
+	return count
+
+class _Replay:
+	'''A lexer that returns the tokens of a previous run'''
+	
+	def __init__(self, tokens):
+		self.__tokens = iter(tokens)
+		
+	def token(self):
+		return next(self.__tokens, None)
+
+def tokenize(text, lexer):
+	'''Returns the LexToken objects of the lexer.BatchLexer'''
+	lexer.reset()
+	tokens = lexer.batchLexer(text)
+	tokens = list(iter(tokens.token, None))
+	if lexer.hasError():
+		raise RuntimeError('Could not tokenize the synthetic source')
+	return tokens
+
+def parse(tokens, yacc):
+	'''Parses the tokens of tokenize(), only the parser is timed'''
+	yacc.parseTokens(_Replay(tokens))
+	if yacc.hasError():
+		raise RuntimeError('Could not parse the synthetic source')
+	return yacc.namelists()
+
+def generate(namelists, filename):
+	'''Returns the number of emitted parameters'''
+	# Unchanged outputs are not written again, every run writes a new file
+	if os.path.exists(filename):
+		os.unlink(filename)
+	emit.emit(namelists, [emit.ParameterFileEmitter(filename)])
+	return sum(len(namelist.parameters()) for namelist in namelists)
+
+def best(repeat, function, *args):
+	'''Returns the result and the fastest time of several runs'''
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function(*args)
+		times.append(time.perf_counter() - start)
+	return result, min(times)
+
+def measure(text, lexer, yacc, repeat):
+	'''Returns the throughput of all phases'''
+	(tokens, statements), lexTime = best(repeat, lex, text, lexer)
+	batchTokens, batchTime = best(repeat, batchLex, text, lexer)
+	if batchTokens != tokens:
+		raise RuntimeError('The batch lexer returned %d instead of %d tokens' % (batchTokens, tokens))
+	namelists, parseTime = best(repeat, parse, tokenize(text, lexer), yacc)
+	fd, filename = tempfile.mkstemp(suffix='.par')
+	os.close(fd)
+	try:
+		parameters, emitTime = best(repeat, generate, namelists, filename)
+	finally:
+		os.unlink(filename)
+	
+	return {
+		'lex tokens/s': tokens / lexTime,
+		'lex statements/s': statements / lexTime,
+		'batch lex tokens/s': tokens / batchTime,
+		'parse tokens/s': tokens / parseTime,
+		'parse statements/s': statements / parseTime,
+		'emit parameters/s': parameters / emitTime
+	}
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Measures the throughput of the lexer, the parser and the parameter file generation on synthetic sources')
+	argParser.add_argument('--subroutines', type=int, default=200,
+		help='number of subroutines (default: %(default)s)')
+	argParser.add_argument('--parameters', type=int, default=20,
+		help='parameters per namelist (default: %(default)s)')
+	argParser.add_argument('--dimension', type=int, default=8,
+		help='maximum array size (default: %(default)s)')
+	argParser.add_argument('--annotations', type=float, default=0.5,
+		help='fraction of annotated declarations (default: %(default)s)')
+	argParser.add_argument('--irrelevant', type=float, default=0.3,
+		help='fraction of statements irrelevant for the namelists (default: %(default)s)')
+	argParser.add_argument('--statements', type=int,
+		help='statements per subroutine, filled up with irrelevant ones (default: from --irrelevant)')
+	argParser.add_argument('-n', '--repeat', type=int, default=5,
+		help='number of runs, the best one is reported (default: %(default)s)')
+	argParser.add_argument('--baseline', default=os.path.join(tables.cacheDirectory(), 'benchmark-baseline.json'),
+		help='file with the baseline results (default: %(default)s)')
+	argParser.add_argument('--save-baseline', action='store_true',
+		help='store the results as baseline instead of comparing them')
+	argParser.add_argument('--tolerance', type=float, default=0.2,
+		help='allowed slowdown compared to the baseline (default: %(default)s)')
+	argParser.add_argument('--scaling', action='store_true',
+		help='also check that the parse time grows linearly with the number of statements in a subroutine')
+	argParser.add_argument('--scaling-statements', type=int, default=10000,
+		help='statements of the smallest subroutine in the scaling check, grown 2x and 4x (default: %(default)s)')
+	argParser.add_argument('--scaling-tolerance', type=float, default=0.5,
+		help='allowed drop of the parsed statements/s on the larger subroutines (default: %(default)s)')
+	args = argParser.parse_args()
+	
+	knobs = (args.subroutines, args.parameters, args.dimension, args.annotations, args.irrelevant, args.statements)
+	text = generateSource(*knobs)
+	
+	cacheDir = tables.cacheDirectory()
+	lexer = FortranLexer(cacheDir)
+	yacc = FortranYacc(lexer.tokens(), cacheDir)
+	
+	results = measure(text, lexer, yacc, args.repeat)
+	print('Lines:  %d' % text.count('\n'))
+	for name, value in results.items():
+		print('%-20s %12.0f' % (name + ':', value))
+	
+	failed = False
+	
+	if args.scaling:
+		# The old right recursive grammar was quadratic in the number of statements of a subroutine
+		rates = []
+		for factor in (1, 2, 4):
+			source = generateSource(1, args.parameters, args.dimension, args.annotations, args.irrelevant, args.scaling_statements * factor)
+			rates.append(measure(source, lexer, yacc, 1)['parse statements/s'])
+			print('Scaling (%dx input):   %.2f' % (factor, rates[-1] / rates[0]))
+		if min(rates[1:]) < rates[0] * (1 - args.scaling_tolerance):
+			print('ERROR: The parse time grows faster than the input', file=sys.stderr)
+			failed = True
+	
+	# Baselines are stored by knobs, the numbers only make sense on the same machine
+	key = ' '.join(map(str, knobs))
+	try:
+		with open(args.baseline) as f:
+			baselines = json.load(f)
+	except (OSError, ValueError):
+		baselines = {}
+	
+	if args.save_baseline:
+		baselines[key] = results
+		os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+		with open(args.baseline, 'w') as f:
+			json.dump(baselines, f, indent='\t')
+		print('Baseline stored in %s' % args.baseline)
+	elif key in baselines:
+		for name, value in results.items():
+			reference = baselines[key].get(name)
+			if reference and value < reference * (1 - args.tolerance):
+				print('ERROR: %s dropped from %.0f to %.0f (%.0f%%)' % (name, reference, value, 100 * (value / reference - 1)), file=sys.stderr)
+				failed = True
+	else:
+		print('No baseline for these settings, use --save-baseline to store one')
+	
+	if failed:
+		sys.exit(1)
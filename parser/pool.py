@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import contextlib
+import threading
+
+from lexer import FortranLexer
+from yacc import FortranYacc
+
+class ParserPool:
+	'''Keeps lexer/parser pairs for reuse
+	
+	Creating a FortranLexer and a FortranYacc is expensive compared to parsing
+	a small file. The pool hands out idle pairs and creates new ones only if
+	all pairs are in use. Pairs are reset when they are returned.'''
+	
+	def __init__(self, cacheDir = None, size = None):
+		'''Creates an empty pool
+		
+		At most size idle pairs are kept (unlimited if None).'''
+		self.__cacheDir = cacheDir
+		self.__size = size
+		self.__idle = []
+		self.__lock = threading.Lock()
+		
+	def acquire(self):
+		'''Returns a tuple (lexer, parser)'''
+		with self.__lock:
+			if self.__idle:
+				return self.__idle.pop()
+		
+		lexer = FortranLexer(self.__cacheDir)
+		return (lexer, FortranYacc(lexer.tokens(), self.__cacheDir))
+	
+	def release(self, lexer, yacc):
+		'''Returns a pair to the pool'''
+		lexer.reset()
+		yacc.reset()
+		yacc.setStats(None)
+		with self.__lock:
+			if self.__size is None or len(self.__idle) < self.__size:
+				self.__idle.append((lexer, yacc))
+				
+	@contextlib.contextmanager
+	def parser(self):
+		'''Context manager for acquire/release'''
+		lexer, yacc = self.acquire()
+		try:
+			yield lexer, yacc
+		finally:
+			self.release(lexer, yacc)
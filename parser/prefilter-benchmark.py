@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import argparse
+import sys
+import time
+
+import tables
+from lexer import FortranLexer
+from prefilter import filterSource
+from yacc import FortranYacc
+
+def describe(namelists):
+	'''Returns everything that ends up in the parameter file'''
+	result = []
+	for namelist in namelists:
+		for parameter in namelist.parameters():
+			define = parameter.define()
+			annotation = define.annotation()
+			result.append((namelist.name(), parameter.name(), str(define.type()), define.size(),
+				annotation.format() if annotation else None,
+				parameter.assignments()))
+	return result
+
+def run(text, lexer, yacc, filtered):
+	start = time.perf_counter()
+	if filtered:
+		text = filterSource(text)
+	yacc.parse(text, lexer)
+	return time.perf_counter() - start, yacc.namelists()
+
+if __name__ == '__main__':
+	argParser = argparse.ArgumentParser(description='Compares the parse time with and without the prefilter')
+	argParser.add_argument('input', nargs='?', default='../SeisSol/src/Reader/readpar.f90',
+		help='Fortran source file (default: %(default)s)')
+	argParser.add_argument('-n', '--repeat', type=int, default=10,
+		help='number of runs, the best one is reported (default: %(default)s)')
+	args = argParser.parse_args()
+	
+	with open(args.input) as f:
+		text = f.read()
+	
+	cacheDir = tables.cacheDirectory()
+	lexer = FortranLexer(cacheDir)
+	yacc = FortranYacc(lexer.tokens(), cacheDir)
+	
+	times = dict()
+	results = dict()
+	for filtered in (False, True):
+		for _ in range(args.repeat):
+			t, namelists = run(text, lexer, yacc, filtered)
+			times[filtered] = min(times.get(filtered, t), t)
+		results[filtered] = describe(namelists)
+		
+	lines = text.split('\n')
+	removed = sum(a != b for a, b in zip(lines, filterSource(text).split('\n')))
+	print('Lines:              %d (%d removed)' % (len(lines), removed))
+	print('Full parse:         %.2f ms' % (times[False] * 1000))
+	print('Prefilter + parse:  %.2f ms' % (times[True] * 1000))
+	print('Speedup:            %.2fx' % (times[False] / times[True]))
+	
+	if results[False] != results[True]:
+		print('ERROR: The prefilter changes the namelists', file=sys.stderr)
+		sys.exit(1)
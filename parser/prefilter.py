@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import re
+
+# Code part of a line: everything up to a comment, a preprocessor
+# directive or a string that is not terminated in the same line
+_code = re.compile(r'''(?:[^'"!#\n]|'[^'\n]*'|"[^"\n]*")*''')
+_literal = re.compile(r''''[^'\n]*'|"[^"\n]*"''')
+
+# Characters that would lead to an error in the lexer
+_illegal = re.compile(r'''[^a-z0-9_ \t,=()/:*.%;+\-<\x00]|<(?!=)|(?<![a-z0-9_])[0-9]*_''', re.IGNORECASE)
+
+# Statements that end up in an error production of the grammar and do
+# not stop at NAMELIST or SUBROUTINE. Literals are replaced by \x00.
+_irrelevant = re.compile(r'''[ \t]*
+	(?:
+		# An identifier followed by anything except = or (
+		(?!(?:module|subroutine|end|namelist|integer|real|character)(?![a-z0-9_]))
+		[a-z][a-z0-9_]*(?![a-z0-9_])[ \t]*
+		(?:
+			$
+			| (?!(?:subroutine|namelist)(?![a-z0-9_]))[a-z]
+			| [0-9,)/:*%;+\-\x00]
+			| <=
+			| \.(?![0-9])
+			# An identifier followed by ( is only interesting for array assignments
+			| \([ \t]*
+				(?:
+					$
+					| (?!(?:subroutine|namelist)(?![a-z0-9_]))[a-z]
+					| [,()/*%;+\-\x00]
+					| <=
+					| \.(?![0-9])
+				)
+		)
+		# END not followed by MODULE or SUBROUTINE (e.g. END IF)
+		| end(?![a-z0-9_])[ \t]*(?:$|(?!(?:module|subroutine)(?![a-z0-9_]))[a-z])
+	)''', re.IGNORECASE | re.VERBOSE)
+
+# Keywords that the grammar needs to see, even if a continuation line
+# joins them to an irrelevant statement
+_boundary = re.compile(r'[ \t]*(?:module|subroutine|end|namelist)(?![a-z0-9_])', re.IGNORECASE)
+
+# Replacement for irrelevant statements. It is a single token that also
+# ends up in an error production, so annotations are handled the same way.
+_placeholder = '*'
+
+def _isIrrelevant(statement):
+	if '\x00' in statement:
+		return False
+	if '\'' in statement or '"' in statement:
+		statement = _literal.sub('\x00', statement)
+	# Statements with lexer errors are kept to keep the error
+	return _irrelevant.match(statement) is not None and not _illegal.search(statement)
+
+def filterSource(text):
+	'''Replaces statements that cannot contribute to a namelist
+	
+	Control flow, calls, I/O and other statements that the grammar drops
+	in an error production are replaced by a single token that is dropped
+	the same way. Runs of such statements (including empty lines and
+	comments in between) are replaced by one token. Declarations,
+	namelists, assignments, annotations, comments and module/subroutine
+	boundaries are kept as they are, also if they are continuation lines of
+	an irrelevant statement. Line numbers do not change.
+	
+	The parser produces the same namelists for the filtered text but has
+	to do much less error recovery. If the text cannot be filtered safely
+	(strings over several lines), it is returned unchanged.'''
+	lines = [line + '\n' for line in text.split('\n')]
+	lines[-1] = lines[-1][:-1]
+	
+	result = []
+	# Physical lines and code of the current statement
+	block = []
+	statement = ''
+	# A continuation line of the statement starts with a boundary keyword
+	keep = False
+	# Number of line breaks in the current run of removed statements
+	removed = 0
+	# Last line if it has no line break
+	last = ''
+	for line in lines:
+		if not line.endswith('\n'):
+			last = line
+			break
+		
+		code = _code.match(line).group()
+		rest = line[len(code):]
+		
+		if rest[:1] in ('\'', '"'):
+			return text
+		
+		if block and _boundary.match(code):
+			keep = True
+		block.append(line)
+		
+		if rest.startswith('#'):
+			if len(block) == 1 and not code.strip():
+				# Preprocessor line
+				if removed:
+					removed += 1
+				else:
+					result.append(line)
+				block = []
+			else:
+				# The directive swallows the line break
+				statement += ' ' + code
+			continue
+		
+		# Same as t_ignore_LINE_BREAK in the lexer, a comment after
+		# the line break is ignored
+		code = code.rstrip(' ')
+		if code.endswith('&'):
+			statement += ' ' + code[:-1]
+			continue
+		
+		statement += ' ' + code
+		if keep or rest.startswith('!>') or rest.startswith('!!'):
+			irrelevant = False
+		elif removed and not statement.strip():
+			# Empty statements do not change anything after an irrelevant statement
+			irrelevant = True
+		else:
+			irrelevant = _isIrrelevant(statement)
+			
+		if irrelevant:
+			removed += len(block)
+		else:
+			if removed:
+				result.append(_placeholder + '\n' * removed)
+				removed = 0
+			result.extend(block)
+		block = []
+		statement = ''
+		keep = False
+		
+	if removed:
+		result.append(_placeholder + '\n' * removed)
+	result.extend(block)
+	result.append(last)
+	return ''.join(result)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+import re
+import sys
+
+# Directives that change the configuration, other directives are ignored
+_directive = re.compile(r'\#[ \t]*(if|ifdef|ifndef|elif|else|endif|define|undef)(?![a-zA-Z0-9_])[ \t]*(.*)')
+_name = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+
+# Tokens of #if expressions
+_expressionToken = re.compile(r'''[ \t]*(?:
+	defined[ \t]*\([ \t]*(?P<defined>[a-zA-Z_][a-zA-Z0-9_]*)[ \t]*\)
+	| defined[ \t]+(?P<definedName>[a-zA-Z_][a-zA-Z0-9_]*)
+	| (?P<number>[0-9]+|0[xX][0-9a-fA-F]+)[uUlL]*
+	| (?P<name>[a-zA-Z_][a-zA-Z0-9_]*)
+	| (?P<operator>&&|\|\||==|!=|<=|>=|<<|>>|[!<>()+\-*/%~&|^])
+	)''', re.VERBOSE)
+_operators = {'&&': ' and ', '||': ' or ', '!': ' not ', '/': '//'}
+
+class ExpressionError(Exception):
+	pass
+
+def _value(text):
+	'''Integer value of a macro, 0 if it is not a number'''
+	match = _expressionToken.fullmatch(text.strip()) if text.strip() else None
+	if not match or not match.group('number'):
+		return 0
+	return int(match.group('number'), 0)
+
+def evaluate(expression, macros):
+	'''Evaluates the expression of an #if or #elif directive
+	
+	Supports defined(), integer arithmetic, comparisons and logical
+	operators. Names that are not defined are 0, like in the C
+	preprocessor. Raises ExpressionError for invalid expressions.'''
+	# Translate to an equivalent Python expression of integers
+	parts = []
+	pos = 0
+	# Number of ! before the current operand
+	negations = 0
+	expression = expression.split('//')[0].split('/*')[0].rstrip()
+	while pos < len(expression):
+		match = _expressionToken.match(expression, pos)
+		if not match or match.end() == pos:
+			raise ExpressionError("Invalid expression '%s'" % expression)
+		pos = match.end()
+		if match.group('defined') or match.group('definedName'):
+			value = int((match.group('defined') or match.group('definedName')) in macros)
+		elif match.group('number'):
+			value = int(match.group('number'), 0)
+		elif match.group('name'):
+			value = _value(macros.get(match.group('name'), '0'))
+		elif match.group('operator') == '!' and expression[pos:].lstrip()[:1] != '(':
+			# Binds stronger than in Python, apply it to the operand directly
+			negations += 1
+			continue
+		else:
+			operator = match.group('operator')
+			parts.append(_operators.get(operator, operator))
+			continue
+		
+		for _ in range(negations):
+			value = int(not value)
+		negations = 0
+		parts.append(str(value))
+	if negations:
+		raise ExpressionError("Invalid expression '%s'" % expression)
+	
+	try:
+		return bool(eval(' '.join(parts), {'__builtins__': {}}))
+	except (SyntaxError, ArithmeticError, TypeError):
+		raise ExpressionError("Invalid expression '%s'" % expression)
+
+def _condition(expression, macros, lineno):
+	try:
+		return evaluate(expression, macros)
+	except ExpressionError as e:
+		print("WARNING: %s in line %d, assuming false" % (e, lineno), file=sys.stderr)
+		return False
+
+def activeRanges(directives, count, macros):
+	'''Returns the token ranges that are active for a configuration
+	
+	directives are tuples (index of the next token, text, line number) as
+	returned by lexer.BatchLexer.directives(), count is the number of tokens.
+	macros maps the names of the defined macros to their values (strings).
+	#define and #undef in the source change the configuration for the
+	following lines. Returns a list of tuples [start, end) of token indices.'''
+	macros = dict(macros)
+	ranges = []
+	active = True
+	start = 0
+	# (parent is active, a branch was taken) of all open #if blocks
+	stack = []
+	for index, text, lineno in directives:
+		match = _directive.match(text)
+		if not match:
+			continue
+		keyword, argument = match.groups()
+		name = _name.match(argument)
+		name = name.group() if name else None
+		wasActive = active
+		
+		if keyword in ('if', 'ifdef', 'ifndef'):
+			if not active:
+				condition = False
+			elif keyword == 'if':
+				condition = _condition(argument, macros, lineno)
+			else:
+				condition = (name in macros) == (keyword == 'ifdef')
+			stack.append((active, condition))
+			active = condition
+		elif not stack and keyword in ('elif', 'else', 'endif'):
+			print("WARNING: #%s without #if in line %d" % (keyword, lineno), file=sys.stderr)
+		elif keyword == 'elif':
+			parent, taken = stack[-1]
+			condition = parent and not taken and _condition(argument, macros, lineno)
+			stack[-1] = (parent, taken or condition)
+			active = condition
+		elif keyword == 'else':
+			parent, taken = stack[-1]
+			stack[-1] = (parent, True)
+			active = parent and not taken
+		elif keyword == 'endif':
+			active = stack.pop()[0]
+		elif active and name:
+			if keyword == 'define':
+				macros[name] = argument[len(name):].strip() or '1'
+			else:
+				macros.pop(name, None)
+		
+		if wasActive and not active:
+			if index > start:
+				ranges.append((start, index))
+		elif active and not wasActive:
+			start = index
+			
+	if stack:
+		print("WARNING: %d #if without #endif" % len(stack), file=sys.stderr)
+	if active and count > start:
+		ranges.append((start, count))
+	return ranges
+
+def parseMacros(text):
+	'''Parses a comma separated list of macros (NAME or NAME=VALUE)'''
+	macros = dict()
+	for definition in text.split(','):
+		name, _, value = definition.strip().partition('=')
+		if not name:
+			continue
+		if not _name.fullmatch(name):
+			raise ValueError("Invalid macro name '%s'" % name)
+		macros[name] = value or '1'
+	return macros
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import json
+import mmap
+import struct
+
+from constraints import ConstraintError, compileAllowedValues
+from namelist import Annotation, Define, Namelist, Parameter, Type
+
+# Increase when the layout or the records change
+FORMAT_VERSION = 1
+
+# Magic, format version, length of the index
+_header = struct.Struct('<8sII')
+_magic = b'SSPARSCH'
+
+class SchemaError(Exception):
+	pass
+
+def parameterRecord(parameter):
+	'''Returns the description of a parameter as a JSON compatible dictionary'''
+	define = parameter.define()
+	type = define.type()
+	annotation = define.annotation()
+	return {
+		'name': parameter.name(),
+		'type': type.type(),
+		'length': type.length if type.hasLength() else None,
+		'dimension': type.dimension if type.hasDimension() else None,
+		'size': define.size(),
+		'values': parameter.assignments() if parameter.hasValues() else None,
+		'annotation': annotation.text() if annotation else None,
+		'allowedValues': annotation.allowedValues() if annotation else None
+	}
+
+def packSchema(index, records):
+	'''Returns the content of a schema file
+	
+	The file starts with a header and a JSON index of all namelists and
+	parameters. Each parameter is stored as a separate JSON record, the index
+	contains the offsets of the records. index is a list of (namelist,
+	[(parameter, offset, length)]), records are the encoded records.'''
+	index = json.dumps(index, separators=(',', ':')).encode()
+	return b''.join([_header.pack(_magic, FORMAT_VERSION, len(index)), index] + records)
+
+def _createParameter(record):
+	type = Type(record['type'], record['length'], record['dimension'])
+	define = Define(type)
+	define.setSize(record['size'])
+	
+	if record['annotation'] is not None:
+		allowedValues = record['allowedValues']
+		define.setAnnotation(Annotation(record['annotation'],
+			'allowed_values' if allowedValues is not None else None, allowedValues))
+		if allowedValues is not None:
+			try:
+				define.setAllowedValues(compileAllowedValues(allowedValues))
+			except ConstraintError:
+				# Already reported when the schema was created
+				pass
+	
+	parameter = Parameter(record['name'])
+	values = record['values']
+	if values is not None:
+		values = [tuple(value) for value in values]
+	parameter.bind(define, values)
+	return parameter
+
+class SchemaFile:
+	'''Reads a schema file written by emit.SchemaEmitter
+	
+	Only the header and the index are read when the file is opened.
+	Parameters are loaded when they are requested.'''
+	
+	def __init__(self, filename):
+		self.__filename = filename
+		
+		with open(filename, 'rb') as f:
+			try:
+				self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			except (OSError, ValueError):
+				self.__data = f.read()
+		
+		try:
+			magic, version, indexLength = _header.unpack_from(self.__data)
+		except struct.error:
+			magic = None
+		if magic != _magic:
+			raise SchemaError("'%s' is not a schema file" % filename)
+		if version != FORMAT_VERSION:
+			raise SchemaError("Schema file '%s' has version %d, expected %d" % (filename, version, FORMAT_VERSION))
+		
+		start = _header.size + indexLength
+		# Lower case namelist name -> (name, {lower case parameter name -> (name, offset, length)})
+		self.__index = {}
+		self.__names = []
+		for name, parameters in json.loads(self.__data[_header.size:start]):
+			self.__index[name.lower()] = (name, {p.lower(): (p, start + offset, length) for p, offset, length in parameters})
+			self.__names.append(name)
+			
+		self.__parameters = {}
+		
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *args):
+		self.close()
+		
+	def close(self):
+		if isinstance(self.__data, mmap.mmap):
+			self.__data.close()
+			
+	def names(self):
+		'''The names of all namelists'''
+		return list(self.__names)
+	
+	def hasNamelist(self, name):
+		return name.lower() in self.__index
+	
+	def parameterNames(self, namelist):
+		'''The names of the parameters in a namelist'''
+		return [name for name, _, _ in self.__index[namelist.lower()][1].values()]
+	
+	def parameter(self, namelist, name):
+		'''Returns a single parameter (case insensitive)
+		
+		Raises KeyError if the parameter does not exist.'''
+		key = (namelist.lower(), name.lower())
+		if key not in self.__parameters:
+			_, offset, length = self.__index[key[0]][1][key[1]]
+			self.__parameters[key] = _createParameter(json.loads(self.__data[offset:offset+length]))
+		return self.__parameters[key]
+	
+	def namelist(self, name):
+		'''Returns the namelist with all parameters (case insensitive)'''
+		name, parameters = self.__index[name.lower()]
+		return Namelist(name, [self.parameter(name, p) for p, _, _ in parameters.values()])
+	
+	def namelists(self):
+		'''Iterates over all namelists, loading them on demand'''
+		for name in self.__names:
+			yield self.namelist(name)
+
+def readSchema(filename):
+	'''Returns all namelists of a schema file'''
+	with SchemaFile(filename) as f:
+		return list(f.namelists())
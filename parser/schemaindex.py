@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import bisect
+
+class SchemaIndex:
+	'''Lookup tables for the parameters of all namelists
+	
+	All names are case insensitive. Lookups return tuples
+	(namelist, parameter). The index does not change when the namelists
+	change, build a new one instead.'''
+	
+	def __init__(self, namelists):
+		self.__namelists = {}
+		self.__parameters = {}
+		self.__byName = {}
+		self.__byType = {}
+		self.__runtime = []
+		
+		for namelist in namelists:
+			lname = namelist.name().lower()
+			self.__namelists[lname] = namelist
+			for parameter in namelist.parameters():
+				entry = (namelist, parameter)
+				self.__parameters[(lname, parameter.lname())] = entry
+				self.__byName.setdefault(parameter.lname(), []).append(entry)
+				
+				type = parameter.define().type()
+				self.__byType.setdefault(type.type(), []).append(entry)
+				if type.hasDimension() and type.dimension == 'inf':
+					self.__runtime.append(entry)
+					
+		# Sorted names for the prefix search
+		self.__names = sorted(self.__byName)
+		
+	def namelist(self, name):
+		'''Returns the namelist or None'''
+		return self.__namelists.get(name.lower())
+	
+	def parameter(self, namelist, name):
+		'''Returns the parameter of a namelist or None'''
+		entry = self.__parameters.get((namelist.lower(), name.lower()))
+		return entry[1] if entry else None
+	
+	def find(self, name):
+		'''Returns all parameters with this name'''
+		return list(self.__byName.get(name.lower(), ()))
+	
+	def prefix(self, prefix):
+		'''Returns all parameters whose name starts with prefix, sorted by name'''
+		prefix = prefix.lower()
+		result = []
+		i = bisect.bisect_left(self.__names, prefix)
+		while i < len(self.__names) and self.__names[i].startswith(prefix):
+			result.extend(self.__byName[self.__names[i]])
+			i += 1
+		return result
+	
+	def ofType(self, type):
+		'''Returns all parameters of a type (e.g. 'integer')'''
+		return list(self.__byType.get(type.lower(), ()))
+	
+	def runtimeDimension(self):
+		'''Returns all parameters with a dimension set at runtime'''
+		return list(self.__runtime)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+import asyncio
+import concurrent.futures
+import errno
+import json
+import os
+import stat
+import sys
+
+import extract
+import schema
+import validate
+import watch
+from schemaindex import SchemaIndex
+
+class QueryError(Exception):
+	pass
+
+class SchemaService:
+	'''Answers schema queries of local clients over a Unix socket
+	
+	The namelists of the sources are kept in memory. The sources are checked
+	every interval seconds (see watch.Watcher) and parsed again in a
+	background thread, queries are answered from the last complete parse in
+	the meantime.
+	
+	Clients send one JSON object per line and get one JSON object per line
+	back, either {"result": ...} or {"error": message}. Queries:
+	  {"query": "namelists"}
+	  {"query": "namelist", "name": NAME}
+	  {"query": "parameter", "namelist": NAMELIST, "name": NAME}
+	  {"query": "find", "name": NAME}
+	  {"query": "prefix", "prefix": PREFIX}
+	  {"query": "validate", "text": PARAMETER FILE}'''
+	
+	# Maximum length of one request line
+	LIMIT = 1 << 24
+	
+	def __init__(self, patterns, parse, interval = 1.0):
+		self.__watcher = watch.Watcher(patterns, parse, self.__update, interval)
+		self.__interval = interval
+		# (namelists, SchemaIndex, validate.Schema)
+		self.__model = ([], SchemaIndex([]), validate.Schema([]))
+		self.__generation = 0
+		self.__queries = {
+			'namelists': self.__namelists,
+			'namelist': self.__namelist,
+			'parameter': self.__parameter,
+			'find': self.__find,
+			'prefix': self.__prefix,
+			'validate': self.__validate,
+			'status': self.__status
+		}
+		
+	def __update(self, results):
+		namelists, duplicates = extract.mergeNamelists(results)
+		# Replace the complete model at once, queries might run concurrently
+		self.__model = (namelists, SchemaIndex(namelists), validate.Schema(namelists))
+		self.__generation += 1
+		
+	async def __watch(self):
+		# The parser is not thread safe, use always the same thread
+		with concurrent.futures.ThreadPoolExecutor(1) as executor:
+			loop = asyncio.get_running_loop()
+			while True:
+				try:
+					if await loop.run_in_executor(executor, self.__watcher.update):
+						self.__update(self.__watcher.results())
+						print('Loaded %d namelists (generation %d)' % (len(self.__model[0]), self.__generation))
+				except Exception as e:
+					# Keeps serving the last model, the sources are checked again in the next interval
+					print('ERROR: Could not update the namelists: %s' % e, file=sys.stderr)
+				await asyncio.sleep(self.__interval)
+	
+	def __namelists(self, request):
+		return [namelist.name() for namelist in self.__model[0]]
+	
+	def __namelist(self, request):
+		namelist = self.__model[1].namelist(request['name'])
+		if not namelist:
+			raise QueryError("Unknown namelist '%s'" % request['name'])
+		return {'name': namelist.name(),
+			'parameters': [parameter.name() for parameter in namelist.parameters()]}
+	
+	def __parameter(self, request):
+		parameter = self.__model[1].parameter(request['namelist'], request['name'])
+		if not parameter:
+			raise QueryError("Unknown parameter '%s' in namelist '%s'" % (request['name'], request['namelist']))
+		return schema.parameterRecord(parameter)
+	
+	def __find(self, request):
+		return [{'namelist': namelist.name(), 'parameter': schema.parameterRecord(parameter)}
+			for namelist, parameter in self.__model[1].find(request['name'])]
+	
+	def __prefix(self, request):
+		return [[namelist.name(), parameter.name()] for namelist, parameter in self.__model[1].prefix(request['prefix'])]
+	
+	def __validate(self, request):
+		report = validate.validateFile('<request>', self.__model[2], request['text'].encode())
+		return [list(issue) for issue in report.issues()]
+	
+	def __status(self, request):
+		return {'generation': self.__generation, 'namelists': len(self.__model[0])}
+	
+	def query(self, request):
+		'''Answers one request (a dictionary), returns the response'''
+		try:
+			if not request.get('query') in self.__queries:
+				raise QueryError("Unknown query '%s'" % request.get('query'))
+			return {'result': self.__queries[request['query']](request)}
+		except QueryError as e:
+			return {'error': str(e)}
+		except KeyError as e:
+			return {'error': 'Missing field %s' % e}
+		except (TypeError, AttributeError):
+			return {'error': 'Invalid request'}
+		
+	async def __client(self, reader, writer):
+		try:
+			while True:
+				try:
+					line = await reader.readline()
+				except ValueError:
+					# Line too long, the stream is not usable anymore
+					writer.write(b'{"error":"Request too long"}\n')
+					break
+				if not line:
+					break
+				try:
+					request = json.loads(line)
+				except ValueError:
+					response = {'error': 'Invalid JSON'}
+				else:
+					response = self.query(request)
+				writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+				await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			writer.close()
+	
+	async def serve(self, path):
+		'''Parses the sources and answers queries on the socket path until cancelled
+		
+		A socket left at path by a previous run is replaced. If another
+		process still accepts connections on it or path is not a socket,
+		an OSError is raised.'''
+		self.__watcher.update()
+		self.__update(self.__watcher.results())
+		
+		try:
+			if not stat.S_ISSOCK(os.lstat(path).st_mode):
+				raise FileExistsError(errno.EEXIST, 'File exists and is not a socket', path)
+			try:
+				_, writer = await asyncio.open_unix_connection(path)
+			except ConnectionRefusedError:
+				# Left over from a previous run
+				os.unlink(path)
+			else:
+				writer.close()
+				raise OSError(errno.EADDRINUSE, 'Socket is used by another process', path)
+		except FileNotFoundError:
+			pass
+		server = await asyncio.start_unix_server(self.__client, path, limit=self.LIMIT)
+		st = os.lstat(path)
+		socket = (st.st_dev, st.st_ino)
+		print("Listening on '%s'" % path)
+		try:
+			async with server:
+				await asyncio.gather(server.serve_forever(), self.__watch())
+		finally:
+			# Only remove the socket of this process, another one might have replaced it
+			try:
+				st = os.lstat(path)
+				if (st.st_dev, st.st_ino) == socket:
+					os.unlink(path)
+			except FileNotFoundError:
+				pass
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import collections
+import contextlib
+import time
+import tracemalloc
+
+def _memory():
+	if tracemalloc.is_tracing():
+		return tracemalloc.get_traced_memory()[0]
+	return 0
+
+class Stats:
+	'''Collects timings, token counts and parser events
+	
+	Phases are identified by name. For each phase, the wall time, the number
+	of calls and the net allocated memory are summed up. The memory is only
+	measured if tracemalloc is tracing.'''
+	
+	def __init__(self):
+		# name -> [time, calls, memory]
+		self.__phases = {}
+		self.__tokens = collections.Counter()
+		self.__counters = collections.Counter()
+		self.__events = []
+		self.__file = None
+		
+	def setFile(self, filename):
+		'''Sets the file that is added to all events'''
+		self.__file = filename
+		
+	def start(self, exclude = ()):
+		'''Returns a token for stop()
+		
+		The time and memory of the phases in exclude, that are spent until
+		stop() is called, are not added to this phase.'''
+		excluded = [(name, self.__phase(name)[:]) for name in exclude]
+		return (time.perf_counter(), _memory(), excluded)
+	
+	def stop(self, name, start):
+		t, memory, excluded = start
+		t = time.perf_counter() - t
+		memory = _memory() - memory
+		for other, before in excluded:
+			after = self.__phase(other)
+			t -= after[0] - before[0]
+			memory -= after[2] - before[2]
+		
+		phase = self.__phase(name)
+		phase[0] += t
+		phase[1] += 1
+		phase[2] += memory
+		
+	@contextlib.contextmanager
+	def phase(self, name, exclude = ()):
+		start = self.start(exclude)
+		try:
+			yield
+		finally:
+			self.stop(name, start)
+			
+	def __phase(self, name):
+		if not name in self.__phases:
+			self.__phases[name] = [0.0, 0, 0]
+		return self.__phases[name]
+	
+	def token(self, type):
+		self.__tokens[type] += 1
+		
+	def count(self, name, n = 1):
+		self.__counters[name] += n
+		
+	def event(self, kind, line, detail = None):
+		'''Records an event, e.g. an error recovery of the parser'''
+		self.__events.append({'kind': kind, 'file': self.__file, 'line': line, 'detail': detail})
+		self.__counters[kind] += 1
+		
+	def merge(self, other):
+		'''Adds the results of another Stats object'''
+		for name, values in other.__phases.items():
+			phase = self.__phase(name)
+			for i in range(3):
+				phase[i] += values[i]
+		self.__tokens.update(other.__tokens)
+		self.__counters.update(other.__counters)
+		self.__events.extend(other.__events)
+		
+	def toDict(self):
+		'''Returns all results as dictionary (e.g. for JSON)'''
+		return {
+			'phases': {name: {'time': t, 'calls': calls, 'memory': memory}
+				for name, (t, calls, memory) in self.__phases.items()},
+			'tokens': dict(self.__tokens.most_common()),
+			'counters': dict(self.__counters),
+			'events': self.__events
+		}
+
+class CountingLexer:
+	'''Wraps a PLY lexer, counts the tokens and measures the time spent for lexing'''
+	
+	def __init__(self, lexer, stats):
+		self.__lexer = lexer
+		self.__stats = stats
+		
+	def token(self):
+		start = self.__stats.start()
+		token = self.__lexer.token()
+		self.__stats.stop('lex', start)
+		if token:
+			self.__stats.token(token.type)
+		return token
+	
+	def __getattr__(self, name):
+		return getattr(self.__lexer, name)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import random
+
+_irrelevant = [
+	'CALL helper_%(i)d(EQN, IO)',
+	'READ(IO%%UNIT%%FileIn, IOSTAT=readStat, nml = %(namelist)s)',
+	'IF (readStat.NE.0) THEN\n      CALL RaiseErrorNml(IO%%UNIT%%FileIn, "%(namelist)s")\n    ENDIF',
+	'DO i = 1, %(i)d\n      EQN%%value(i) = i * 2\n    ENDDO',
+	'SELECT CASE(%(parameter)s)\n    CASE(0)\n      logInfo(*) \'Value is zero\'\n    CASE DEFAULT\n      EQN%%%(parameter)s = %(parameter)s\n    END SELECT',
+	'EQN%%%(parameter)s = %(parameter)s'
+]
+
+_types = ['INTEGER', 'REAL', 'CHARACTER(LEN=600)']
+
+def generateSource(subroutines = 100, parameters = 20, dimension = 8, annotations = 0.5, irrelevant = 0.3, statements = None, seed = 0):
+	'''Generates a Fortran module with constructs known to the parser
+	
+	Every subroutine declares one namelist with the given number of
+	parameters. Up to a quarter of the parameters are arrays with at most
+	dimension elements (some with a dimension set at runtime). annotations
+	is the fraction of declarations with an annotation, irrelevant the
+	fraction of statements that do not matter for the namelists. If
+	statements is given, every subroutine is filled up with irrelevant
+	statements to this number of statements instead.'''
+	rand = random.Random(seed)
+	lines = ['MODULE synthetic_mod', '  IMPLICIT NONE', 'CONTAINS', '']
+	
+	for s in range(subroutines):
+		namelist = 'nml%d' % s
+		lines += ['  SUBROUTINE read_%s(EQN, IO)' % namelist,
+			'    IMPLICIT NONE',
+			'    TYPE (tEquations)          :: EQN',
+			'    TYPE (tInputOutput)        :: IO',
+			'    INTEGER                    :: i, readStat']
+		
+		names = []
+		body = []
+		for p in range(parameters):
+			name = 'p%d_%d' % (s, p)
+			names.append(name)
+			type = rand.choice(_types)
+			
+			if rand.random() < annotations:
+				lines.append('    !> Description of %s' % name)
+				if type == 'INTEGER' and rand.random() < 0.5:
+					lines.append('    !! @allowed_values 0, 1, 2')
+				elif rand.random() < 0.3:
+					lines.append('    !! which continues in the next line')
+			
+			size = 1
+			if dimension > 1 and rand.random() < 0.25 and type != 'CHARACTER(LEN=600)':
+				if rand.random() < 0.1:
+					lines.append('    %s, DIMENSION(:), ALLOCATABLE :: %s' % (type, name))
+				else:
+					size = rand.randint(2, dimension)
+					lines.append('    %-26s :: %s(%d)' % (type, name, size))
+			else:
+				lines.append('    %-26s :: %s' % (type, name))
+			
+			if rand.random() < 0.8:
+				value = {'INTEGER': '1', 'REAL': '0', 'CHARACTER(LEN=600)': "'file.txt'"}[type]
+				if size > 1 and rand.random() < 0.5:
+					body.append('%s(1:%d) = %s' % (name, size // 2, value))
+					body.append('%s(%d:%d) = %s' % (name, size // 2 + 1, size, value))
+				elif size > 1:
+					body.append('%s(:) = %s' % (name, value))
+				else:
+					body.append('%s = %s' % (name, value))
+		
+		# Namelist with continuation lines
+		chunks = [', '.join(names[i:i+4]) for i in range(0, len(names), 4)]
+		lines.append('    NAMELIST /%s/ %s' % (namelist, ', &\n        '.join(chunks)))
+		
+		count = len(body)
+		if statements is not None:
+			count = max(statements - count, 0)
+		elif irrelevant < 1:
+			count = int(round(count * irrelevant / (1 - irrelevant)))
+		for i in range(count):
+			statement = rand.choice(_irrelevant) % {'i': i, 'namelist': namelist, 'parameter': rand.choice(names)}
+			body.insert(rand.randint(0, len(body)), statement)
+			
+		lines += ['    ' + statement for statement in body]
+		lines += ['  END SUBROUTINE read_%s' % namelist, '']
+		
+	lines.append('END MODULE synthetic_mod')
+	return '\n'.join(lines) + '\n'
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import hashlib
+import importlib.util
+import os
+
+import ply
+
+def cacheDirectory():
+	'''Returns the user cache directory for the parse and lex tables'''
+	base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(base, 'seissol-parameter-file')
+
+def signature(rules, tokens, extra = ()):
+	'''Computes a hash over the rule docstrings/regexes and the token list
+	
+	rules is a dictionary from rule names to functions or strings. The
+	PLY version is included to invalidate the tables on an upgrade.'''
+	h = hashlib.sha1()
+	h.update(ply.__version__.encode())
+	for name in sorted(rules):
+		rule = rules[name]
+		if callable(rule):
+			rule = rule.__doc__
+		h.update(('%s=%s\n' % (name, rule)).encode())
+	h.update(' '.join(sorted(tokens)).encode())
+	h.update(repr(extra).encode())
+	return h.hexdigest()[:16]
+
+def pruneDirectory(directory, maxEntries):
+	'''Removes the oldest files if the directory has more than maxEntries
+	
+	Caches update the modification time of an entry when they use it, so
+	the least recently used entries are removed, including the ones of
+	older code versions.'''
+	try:
+		entries = sorted((entry.stat().st_mtime_ns, entry.path)
+			for entry in os.scandir(directory) if entry.is_file())
+	except OSError:
+		# Removed by another process in the meantime
+		return
+	for _, path in entries[:max(len(entries) - maxEntries, 0)]:
+		try:
+			os.unlink(path)
+		except OSError:
+			pass
+
+def touch(filename):
+	'''Marks a cache entry as recently used for pruneDirectory'''
+	try:
+		os.utime(filename)
+	except OSError:
+		pass
+
+def loadTable(directory, name):
+	'''Returns the table module stored in the directory or its name
+	
+	PLY expects either a module object or a module name. If the table does
+	not exist yet, the name is returned and PLY writes the table to the
+	directory.'''
+	try:
+		os.makedirs(directory, exist_ok=True)
+	except OSError:
+		# PLY will only print a warning if it cannot write the table
+		return name
+	
+	filename = os.path.join(directory, name + '.py')
+	if not os.path.exists(filename):
+		return name
+	
+	spec = importlib.util.spec_from_file_location(name, filename)
+	module = importlib.util.module_from_spec(spec)
+	try:
+		spec.loader.exec_module(module)
+	except Exception:
+		# Broken table (e.g. interrupted write) -> rebuild it
+		return name
+	return module
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+import array
+import hashlib
+import itertools
+import os
+import pickle
+import tempfile
+import zlib
+
+import ply
+
+import lexer
+import tables
+
+# Maximum number of cached files, see pruneCache
+MAX_ENTRIES = 2000
+
+def _lexerVersion():
+	'''Hash of the lexer, cached tokens depend on it'''
+	h = hashlib.sha1()
+	h.update(ply.__version__.encode())
+	with open(lexer.__file__, 'rb') as f:
+		h.update(f.read())
+	return h.hexdigest()
+
+def _encode(state):
+	'''Stores the offsets and line numbers as differences, they compress well'''
+	typeNames, types, starts, ends, lines = state[:5]
+	gaps = array.array('I', [start - end for start, end in zip(starts, itertools.chain([0], ends))])
+	lengths = array.array('I', [end - start for start, end in zip(starts, ends)])
+	lineSteps = array.array('I', [line - previous for line, previous in zip(lines, itertools.chain([0], lines))])
+	data = pickle.dumps((typeNames, types, gaps, lengths, lineSteps) + tuple(state[5:]), pickle.HIGHEST_PROTOCOL)
+	return zlib.compress(data, 1)
+
+def _decode(data):
+	typeNames, types, gaps, lengths, lineSteps, *rest = pickle.loads(zlib.decompress(data))
+	offsets = array.array('l', itertools.accumulate(itertools.chain.from_iterable(zip(gaps, lengths))))
+	lines = array.array('l', itertools.accumulate(lineSteps))
+	return (typeNames, types, offsets[0::2], offsets[1::2], lines, *rest)
+
+def pruneCache(cacheDir, maxEntries = MAX_ENTRIES):
+	'''Removes the least recently used entries from the token cache in cacheDir'''
+	tables.pruneDirectory(os.path.join(cacheDir, 'tokens'), maxEntries)
+
+class TokenCache:
+	'''Stores the tokens of lexer.BatchLexer objects on disk
+	
+	Entries are keyed by a hash of the lexer version, the first line number
+	and the text, so they never have to be invalidated, pruneCache removes
+	the ones that were not used for a long time. An entry contains
+	the compressed token arrays of the BatchLexer (see BatchLexer.state)
+	but not the text itself.'''
+	
+	def __init__(self, cacheDir):
+		self.__cacheDir = os.path.join(cacheDir, 'tokens')
+		os.makedirs(self.__cacheDir, exist_ok=True)
+		self.__version = _lexerVersion()
+		self.__hits = 0
+		self.__misses = 0
+		
+	def hits(self):
+		return self.__hits
+	
+	def misses(self):
+		return self.__misses
+		
+	def __filename(self, text, lineno):
+		h = hashlib.sha1(('%s %d\n' % (self.__version, lineno)).encode())
+		h.update(text.encode())
+		return os.path.join(self.__cacheDir, h.hexdigest() + '.pickle')
+	
+	def load(self, text, lineno):
+		'''Returns the state of the BatchLexer for the text or None'''
+		filename = self.__filename(text, lineno)
+		try:
+			with open(filename, 'rb') as f:
+				state = _decode(f.read())
+			tables.touch(filename)
+		except (OSError, ValueError, pickle.UnpicklingError, EOFError, zlib.error):
+			self.__misses += 1
+			return None
+		self.__hits += 1
+		return state
+	
+	def store(self, text, lineno, state):
+		# Write atomically, other processes might read the same entry
+		fd, tmpFile = tempfile.mkstemp(dir=self.__cacheDir)
+		with os.fdopen(fd, 'wb') as f:
+			f.write(_encode(state))
+		os.replace(tmpFile, self.__filename(text, lineno))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+
+import multiprocessing
+import os
+
+from parfile import FormatError, ParameterFile
+
+class Schema:
+	'''The parameters allowed in a parameter file
+	
+	Compiled from the extracted namelists into plain dictionaries and tuples,
+	so it can be sent to worker processes cheaply.'''
+	
+	def __init__(self, namelists):
+		# namelist -> parameter -> (name, type, length, size, runtime dimension, allowed values)
+		self.__namelists = {}
+		for namelist in namelists:
+			parameters = {}
+			for parameter in namelist.parameters():
+				type = parameter.define().type()
+				parameters[parameter.lname()] = (parameter.name(), type.type(),
+					type.length if type.hasLength() else None,
+					parameter.define().size(), type.hasDimension(),
+					parameter.define().allowedValues())
+			self.__namelists[namelist.name().lower()] = (namelist.name(), parameters)
+			
+	def namelist(self, name):
+		'''Returns the name and the parameters of a namelist or None'''
+		return self.__namelists.get(name.lower())
+
+class Report:
+	'''The issues found in one parameter file
+	
+	Each issue is a tuple (kind, namelist, parameter, message). kind is one of
+	'format', 'namelist', 'unknown', 'type', 'length', 'size' or 'allowed'.'''
+	
+	def __init__(self, filename):
+		self.__filename = filename
+		self.__issues = []
+		
+	def add(self, kind, namelist, parameter, message):
+		self.__issues.append((kind, namelist, parameter, message))
+		
+	def filename(self):
+		return self.__filename
+	
+	def issues(self):
+		return self.__issues
+	
+	def hasIssues(self):
+		return bool(self.__issues)
+	
+def _hasCorrectType(type, value):
+	'''Same rules as Parameter.hasCorrectValueType'''
+	if type == 'integer' or type == 'real':
+		return isinstance(value, (int, float)) and not isinstance(value, bool)
+	if type == 'character':
+		return isinstance(value, str)
+	return True
+
+def validateFile(filename, schema, data = None):
+	'''Checks one parameter file against the schema
+	
+	If data (bytes) is given, it is checked instead of the content of the
+	file.'''
+	report = Report(filename)
+	try:
+		with ParameterFile(filename, data=data) as f:
+			for namelist in f.namelists():
+				entry = schema.namelist(namelist.name())
+				if not entry:
+					report.add('namelist', namelist.name(), None, "Unknown namelist '%s'" % namelist.name())
+					continue
+				name, parameters = entry
+				
+				for parameter in namelist.parameters():
+					if not parameter.lname() in parameters:
+						report.add('unknown', name, parameter.name(), "Unknown parameter '%s' in namelist '%s'" % (parameter.name(), name))
+						continue
+					pname, type, length, size, runtime, allowed = parameters[parameter.lname()]
+					values = [value for value, _, _ in parameter.assignments()]
+					count = parameter.define().size()
+					
+					if not all(_hasCorrectType(type, value) for value in values):
+						report.add('type', name, pname, "Invalid value for '%s', expected %s" % (pname, type))
+					else:
+						if length is not None and type == 'character':
+							longest = max(map(len, values), default=0)
+							if longest > length:
+								report.add('length', name, pname, "Value of '%s' longer than %d characters" % (pname, length))
+						if allowed:
+							invalid = allowed.invalid(values)
+							if invalid:
+								report.add('allowed', name, pname, "Value(s) %s of '%s' not allowed, allowed values: %s"
+									% (', '.join(map(repr, invalid)), pname, allowed))
+					
+					if not runtime and count != size:
+						report.add('size', name, pname, "Found %d values for '%s', expected %d" % (count, pname, size))
+	except FormatError as e:
+		report.add('format', None, None, str(e))
+	except OSError as e:
+		report.add('format', None, None, "Could not read '%s': %s" % (filename, e.strerror))
+	return report
+
+def findParameterFiles(paths, extension = '.par'):
+	'''Expands directories into the parameter files they contain'''
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, files in os.walk(path):
+				dirs.sort()
+				for name in sorted(files):
+					if name.endswith(extension):
+						yield os.path.join(root, name)
+		else:
+			yield path
+
+# Schema of a worker process
+_schema = None
+
+def _initWorker(schema):
+	global _schema
+	_schema = schema
+	
+def _validateWorker(filename):
+	return validateFile(filename, _schema)
+
+def validateFiles(filenames, schema, jobs = None):
+	'''Checks parameter files in a pool of worker processes
+	
+	The schema is sent once to every worker. Yields one Report per file in
+	the order of filenames.'''
+	if jobs is None:
+		jobs = os.cpu_count() or 1
+	
+	if jobs <= 1:
+		for filename in filenames:
+			yield validateFile(filename, schema)
+		return
+	
+	with multiprocessing.Pool(jobs, _initWorker, (schema,)) as pool:
+		yield from pool.imap(_validateWorker, filenames, chunksize=64)
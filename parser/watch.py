@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+##
+# @file
+# This file is part of SeisSol.
+#
+# @author Sebastian Rettenberger (sebastian.rettenberger AT tum.de, http://www5.in.tum.de/wiki/index.php/Sebastian_Rettenberger)
+#
+# @section LICENSE
+# Copyright (c) 2017, SeisSol Group
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# @section DESCRIPTION
+#
+
+import hashlib
+import os
+import sys
+import time
+
+import extract
+from yacc import ParseError
+
+class Watcher:
+	'''Regenerates the output whenever one of the sources changes
+	
+	The sources are given as glob patterns (see extract.expandInputs) and
+	are polled every interval seconds. A file is only read if its size or
+	modification time changed and only parsed again if the hash of its
+	content changed. parse(filename) returns an extract.Result, the results
+	of unchanged files are reused. generate(results) is called with the
+	results of all files after every change. A file that cannot be parsed
+	keeps its previous result.'''
+	
+	def __init__(self, patterns, parse, generate, interval = 1.0):
+		self.__patterns = patterns
+		self.__parse = parse
+		self.__generate = generate
+		self.__interval = interval
+		self.__filenames = []
+		# filename -> [(mtime, size), digest, result], None for unreadable files,
+		# the result is None for files that were never parsed successfully
+		self.__files = dict()
+		
+	def results(self):
+		'''Results of all readable files in the order of the patterns'''
+		return [self.__files[filename][2] for filename in self.__filenames
+			if self.__files.get(filename) and self.__files[filename][2] is not None]
+		
+	def update(self):
+		'''Checks all sources and parses the changed ones
+		
+		Returns True if the results changed.'''
+		filenames = extract.expandInputs(self.__patterns)
+		changed = filenames != self.__filenames
+		for filename in set(self.__files) - set(filenames):
+			del self.__files[filename]
+		
+		for filename in filenames:
+			entry = self.__files.get(filename)
+			try:
+				st = os.stat(filename)
+				key = (st.st_mtime_ns, st.st_size)
+				if entry and entry[0] == key:
+					continue
+				with open(filename, 'rb') as f:
+					digest = hashlib.sha1(f.read()).digest()
+			except OSError as e:
+				if entry is not None or not filename in self.__files:
+					print("WARNING: Could not read '%s': %s" % (filename, e.strerror), file=sys.stderr)
+					self.__files[filename] = None
+					changed = True
+				continue
+			
+			if entry and entry[1] == digest:
+				# Touched but not modified
+				entry[0] = key
+				continue
+			
+			try:
+				result = self.__parse(filename)
+			except (OSError, UnicodeDecodeError, ParseError) as e:
+				# Keeps the previous result, the file is parsed again when it changes
+				print("WARNING: Could not parse '%s': %s" % (filename, e), file=sys.stderr)
+				if entry:
+					entry[0:2] = [key, digest]
+				else:
+					self.__files[filename] = [key, digest, None]
+				continue
+			
+			self.__files[filename] = [key, digest, result]
+			changed = True
+			
+		self.__filenames = filenames
+		return changed
+	
+	def run(self):
+		'''Polls the sources until interrupted'''
+		while True:
+			if self.update():
+				self.__generate(self.results())
+			time.sleep(self.__interval)
@@ -38,11 +38,15 @@
 # @section DESCRIPTION
 #
 
+import contextlib
 import sys
 
 import ply.yacc as yacc
 
+import tables
+from constraints import ConstraintError, compileAllowedValues
 from namelist import Namelist, Parameter, Define, Type, Annotation
+from stats import CountingLexer
 
 class ParseError(Exception):
 	pass
@@ -69,13 +73,20 @@ class FortranYacc:
 	# Enable/Disable debug information
 	__debug = False
 	
-	# Has error
-	__hasError = False
-	
-	# The namelists found in the file
-	__namelists = []
-	
-	def __init__(self, tokens):
+	def __init__(self, tokens, cacheDir = None):
+		'''Creates the parser
+		
+		If cacheDir is set, the parse table is stored in this directory and
+		reused as long as the grammar and tokens do not change.'''
+		# Has error
+		self.__hasError = False
+		
+		# The namelists found in the file
+		self.__namelists = []
+		
+		# Optional instrumentation (stats.Stats)
+		self.__stats = None
+		
 		# Currently node needed
 		#precedence = ()
 
@@ -88,6 +99,7 @@ class FortranYacc:
 			
 		def p_file_statement_error(p):
 			'file_statement : error'
+			self.__recordRecovery('file_statement')
 
 		def p_file_statement_module(p):
 			'''file_statement : MODULE ID END_LINE module_lines module_end
@@ -107,6 +119,7 @@ class FortranYacc:
 				
 		def p_module_statement_error(p):
 			'module_statement : error'
+			self.__recordRecovery('module_statement')
 			self.__testForImportantToken(p[1])
 			#print('module error', p[1])
 			#print("Parser state: %s" % self.__parser.statestack)
@@ -115,6 +128,8 @@ class FortranYacc:
 		def p_module_statement_subroutine(p):
 			'''module_statement : SUBROUTINE ID BRACKET func_parameter BRACKET subroutine_bind subroutine_lines end_subroutine'''
 			#print(p[2])
+			if self.__stats:
+				start = self.__stats.start()
 			
 			defines = Defines()
 			assigns = Assigns()
@@ -143,8 +158,15 @@ class FortranYacc:
 							ParseError("Found define after assigns in '%s'" % p[2])
 							
 						if lastAnnotation:
+							allowedValues = None
+							if lastAnnotation.allowedValues() is not None:
+								try:
+									allowedValues = compileAllowedValues(lastAnnotation.allowedValues())
+								except ConstraintError as e:
+									print("WARNING: %s in subroutine '%s'" % (e, p[2]), file=sys.stderr)
 							for _,define in line.items():
 								define.setAnnotation(lastAnnotation)
+								define.setAllowedValues(allowedValues)
 						defines.update(line)
 					elif type(line) is Namelist:
 						if assigns:
@@ -165,23 +187,30 @@ class FortranYacc:
 					if not parameter.lname() in defines:
 						raise ParseError("Parameter '%s' in namelist '%s' not defined" % (parameter.name(), namelist.name()))
 						
-					parameter.setDefine(defines[parameter.lname()])
-					if parameter.lname() in assigns:
-						parameter.setValues(assigns[parameter.lname()])
+					parameter.bind(defines[parameter.lname()], assigns.get(parameter.lname()))
 					# TODO add comment
 					
 			self.__namelists.extend(namelists)
+			if self.__stats:
+				self.__stats.stop('bind', start)
 			
 		def p_func_parameter(p):
 			'''func_parameter :
-				| ID
-				| ID COMMA func_parameter'''
+				| func_parameter_list'''
 			if len(p) == 2:
-				p[0] = [p[1]]
-			elif len(p) == 4:
-				p[0] = [p[1]] + p[3]
+				p[0] = p[1]
 			else:
 				p[0] = []
+				
+		def p_func_parameter_list(p):
+			'''func_parameter_list : ID
+				| func_parameter_list COMMA ID'''
+			# Left recursion: lists grow in place and the stack stays small
+			if len(p) == 2:
+				p[0] = [p[1]]
+			else:
+				p[0] = p[1]
+				p[0].append(p[3])
 			
 		def p_subroutine_bind(p):
 			'''subroutine_bind :
@@ -205,14 +234,17 @@ class FortranYacc:
 				
 		def p_subroutine_lines(p):
 			'''subroutine_statements : subroutine_statement
-				| subroutine_statement END_LINE
-				| subroutine_statement END_LINE subroutine_statements'''
-			p[0] = [p[1]]
-			if len(p) > 3:
-				p[0] += p[3]
+				| subroutine_statements END_LINE subroutine_statement'''
+			# A trailing END_LINE is followed by an empty statement
+			if len(p) == 2:
+				p[0] = [p[1]]
+			else:
+				p[0] = p[1]
+				p[0].append(p[3])
 				
 		def p_subroutine_error(p):
 			'subroutine_statement : error'
+			self.__recordRecovery('subroutine_statement')
 			self.__testForImportantToken(p[1])
 			#print('subroutine error', p[1])
 			
@@ -234,8 +266,7 @@ class FortranYacc:
 				| type COMMA type_modifer_list'''
 			p[0] = p[1]
 			if len(p) > 2:
-				for attr, value in p[3].items():
-					setattr(p[0], attr, value)
+				p[0] = p[0].modified(**p[3])
 				
 		def p_type(p):
 			'''type : REAL
@@ -243,15 +274,14 @@ class FortranYacc:
 				| CHARACTER
 				| CHARACTER BRACKET INT BRACKET
 				| CHARACTER BRACKET ID ASSIGN INT BRACKET'''
-			type = Type(p[1])
-			if len(p) > 2:
-				if len(p) > 5:
-					if p[3].lower() != 'len':
-						raise ParseError('Unknown type modifier %s' % p[3])
-					type.length = p[5]
-				else:
-					type.length = p[3]
-			p[0] = type
+			if len(p) > 5:
+				if p[3].lower() != 'len':
+					raise ParseError('Unknown type modifier %s' % p[3])
+				p[0] = Type(p[1], p[5])
+			elif len(p) > 2:
+				p[0] = Type(p[1], p[3])
+			else:
+				p[0] = Type(p[1])
 				
 		def p_type_modifier_list(p):
 			'''type_modifer_list : type_modifier
@@ -270,13 +300,12 @@ class FortranYacc:
 				
 		def p_define_variables(p):
 			'''define_variables : define_variable
-				| define_variable COMMA define_variables'''
+				| define_variables COMMA define_variable'''
 			if len(p) == 2:
 				p[0] = [p[1]]
-			elif len(p) == 4:
-				p[0] = [p[1]] + p[3]
 			else:
-				p[0] = []
+				p[0] = p[1]
+				p[0].append(p[3])
 				
 		def p_define_variable(p):
 			'''define_variable : ID
@@ -298,10 +327,12 @@ class FortranYacc:
 			
 		def p_namelist_variables(p):
 			'''namelist_variables : ID
-				| ID COMMA namelist_variables'''
-			p[0] = [Parameter(p[1])]
-			if len(p) > 2:
-				p[0] += p[3]
+				| namelist_variables COMMA ID'''
+			if len(p) == 2:
+				p[0] = [Parameter(p[1])]
+			else:
+				p[0] = p[1]
+				p[0].append(Parameter(p[3]))
 				
 		def p_subroutine_statement_assign(p):
 			'subroutine_statement : ID ASSIGN expression'
@@ -354,7 +385,7 @@ class FortranYacc:
 			
 		def p_annotation_special(p):
 			'annotation : annotation_keyword ANNO_TEXT'
-			p[0] = Annotation('\n' + p[1] + ': ' + p[2])
+			p[0] = Annotation('\n' + p[1] + ': ' + p[2], p[1].lower(), p[2])
 			
 		def p_annotation_keyword(p):
 			'''annotation_keyword : ANNO_ALLOWED_VALUES
@@ -363,6 +394,8 @@ class FortranYacc:
 			p[0] = p[1]
 
 		def p_error(p):
+			if self.__stats:
+				self.__stats.count('syntax error')
 			if not p:
 				print('Invalid parser state reached')
 				if self.__debug:
@@ -373,10 +406,69 @@ class FortranYacc:
 			#self.__parser.errok()
 			
 		
-		self.__parser = yacc.yacc(debug=self.__debug)
+		if cacheDir:
+			rules = {name: rule for name, rule in locals().items() if name.startswith('p_')}
+			parsetab = tables.loadTable(cacheDir, 'parsetab_' + tables.signature(rules, tokens))
+			self.__parser = yacc.yacc(debug=self.__debug, tabmodule=parsetab, outputdir=cacheDir)
+		else:
+			# Keeps the source tree clean, the tables are built on every run
+			self.__parser = yacc.yacc(debug=self.__debug, write_tables=False)
+		
+	def reset(self):
+		'''Removes the namelists and the error flag of the last parse'''
+		self.__hasError = False
+		self.__namelists = []
+		
+	def setStats(self, stats):
+		'''Enables the instrumentation with a stats.Stats object (None to disable)
+		
+		Records the phases lex, parse (without lex and bind) and bind, the
+		tokens by type and the error recoveries.'''
+		self.__stats = stats
 		
-	def parse(self, text, lexer):
-		self.__parser.parse(text, lexer=lexer.lexer())
+	def stats(self):
+		return self.__stats
+		
+	def parse(self, text, lexer, lineno = 1, batch = False):
+		'''Parses the text
+		
+		Every call starts from scratch, the parser and the lexer are reset.
+		With batch, the text is tokenized at once with a lexer.BatchLexer
+		before parsing.'''
+		self.reset()
+		lexer.reset(lineno)
+		if batch:
+			with self.__stats.phase('lex') if self.__stats else contextlib.nullcontext():
+				tokens = lexer.batchLexer(text, lineno)
+			self.__run(None, tokens)
+		else:
+			self.__run(text, lexer.lexer())
+		
+	def parseTokens(self, tokens):
+		'''Parses the tokens of a lexer that already tokenized its input
+		
+		Used for views of a lexer.BatchLexer, the lexer is not reset.'''
+		self.reset()
+		self.__run(None, tokens)
+		
+	def parseStream(self, f, lexer, lineno = 1):
+		'''Parses a file object without reading it into memory at once'''
+		self.reset()
+		lexer.reset(lineno)
+		stream = lexer.streamLexer(f)
+		try:
+			self.__run(None, stream)
+		finally:
+			stream.close()
+			
+	def __run(self, text, lexer):
+		if not self.__stats:
+			self.__parser.parse(text, lexer=lexer)
+			return
+		
+		start = self.__stats.start(exclude=('lex', 'bind'))
+		self.__parser.parse(text, lexer=CountingLexer(lexer, self.__stats))
+		self.__stats.stop('parse', start)
 		
 	def namelists(self):
 		return self.__namelists
@@ -384,11 +476,21 @@ class FortranYacc:
 	def hasError(self):
 		return self.__hasError
 	
+	def __recordRecovery(self, rule):
+		# Recoveries are part of normal operation (they skip irrelevant
+		# statements) -> only count them
+		if self.__stats:
+			self.__stats.count('error recovery: ' + rule)
+		
 	def __testForImportantToken(self, token):
 		if token.type == 'SUBROUTINE':
 			print('Skipping subroutine at line %d' % token.lineno, file=sys.stderr)
+			if self.__stats:
+				self.__stats.event('skipped subroutine', token.lineno)
 			#print("Parser stack: %s" % self.__parser.statestack)
 			self.__hasError = True
 		elif token.type == 'NAMELIST':
 			print('Skipping namelist at line %d' % token.lineno, file=sys.stderr)
+			if self.__stats:
+				self.__stats.event('skipped namelist', token.lineno)
 			self.__hasError = True
\ No newline at end of file